@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Benchmark CarsXMLParser on synthetic catalogs and flag regressions
+against a stored baseline
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(SCRIPTS_DIR, 'bench-baseline.json')
+
+# Throughput metrics (higher is better) and the memory metric (lower is better)
+THROUGHPUT_METRICS = ('parse_rows_per_s', 'transform_rows_per_s', 'dump_rows_per_s')
+MEMORY_METRIC = 'peak_rss_mb'
+
+
+def load_script(name: str):
+    """Import one of the hyphenated scripts next to this file"""
+    path = os.path.join(SCRIPTS_DIR, f"{name}.py")
+    module_name = name.replace('-', '_')
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_once(xml_file: str, stream: bool, jobs: int, fmt: str) -> Dict:
+    """Parse, transform and dump one catalog in this process and return its metrics"""
+    parser_module = load_script('parse-cars-xml')
+    parser = parser_module.CarsXMLParser(xml_file)
+
+    start = time.perf_counter()
+    parser.parse(stream=stream, jobs=jobs)
+    parse_time = time.perf_counter() - start
+
+    # parse() already ran the spec formulas once; time a second pass on its own
+    start = time.perf_counter()
+    parser._generate_specs()
+    transform_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        parser.generate_sql_dump(os.path.join(tmp, 'dump.sql'), fmt=fmt)
+        dump_time = time.perf_counter() - start
+
+    rows = len(parser.modifications)
+    return {
+        'rows': rows,
+        'parse_s': round(parse_time, 3),
+        'transform_s': round(transform_time, 3),
+        'dump_s': round(dump_time, 3),
+        'parse_rows_per_s': round(rows / parse_time),
+        'transform_rows_per_s': round(rows / transform_time) if transform_time else None,
+        'dump_rows_per_s': round(rows / dump_time),
+        MEMORY_METRIC: parser_module._peak_rss_mb(),
+    }
+
+
+def ensure_catalog(workdir: str, scale: float, seed: int) -> str:
+    """Generate the synthetic catalog for a scale unless it is already cached"""
+    xml_file = os.path.join(workdir, f"cars-x{scale:g}-seed{seed}.xml")
+    if not os.path.exists(xml_file):
+        load_script('generate-cars-xml').generate(xml_file, scale, seed)
+    return xml_file
+
+
+def run_isolated(xml_file: str, args) -> Dict:
+    """Run one measurement in a fresh interpreter so peak RSS is per run"""
+    command = [sys.executable, os.path.abspath(__file__), '--run-one', xml_file,
+               '--jobs', str(args.jobs), '--format', args.format]
+    if args.stream:
+        command.append('--stream')
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def best_of(runs: List[Dict]) -> Dict:
+    """Best value of every metric across repeated runs"""
+    result = dict(runs[0])
+    for run in runs[1:]:
+        for metric in THROUGHPUT_METRICS:
+            if run[metric] is not None:
+                result[metric] = max(result[metric] or 0, run[metric])
+        if run[MEMORY_METRIC] is not None:
+            result[MEMORY_METRIC] = min(result[MEMORY_METRIC] or run[MEMORY_METRIC], run[MEMORY_METRIC])
+        for metric in ('parse_s', 'transform_s', 'dump_s'):
+            result[metric] = min(result[metric], run[metric])
+    return result
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Return a description of every metric that is worse than the baseline by more than tolerance"""
+    regressions = []
+    for scale, metrics in results.items():
+        reference = baseline.get(scale)
+        if not reference:
+            continue
+        for metric in THROUGHPUT_METRICS:
+            if metrics.get(metric) and reference.get(metric) and metrics[metric] < reference[metric] * (1 - tolerance):
+                regressions.append(f"x{scale} {metric}: {metrics[metric]} < {reference[metric]}")
+        if (reference.get(MEMORY_METRIC) and metrics.get(MEMORY_METRIC)
+                and metrics[MEMORY_METRIC] > reference[MEMORY_METRIC] * (1 + tolerance)):
+            regressions.append(f"x{scale} {MEMORY_METRIC}: {metrics[MEMORY_METRIC]} > {reference[MEMORY_METRIC]}")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark the cars.xml parser')
+    arg_parser.add_argument('--scales', default='1',
+                            help='comma-separated catalog sizes relative to cars.xml, e.g. 1,10,100')
+    arg_parser.add_argument('--seed', type=int, default=42)
+    arg_parser.add_argument('--repeat', type=int, default=3, help='runs per scale; the best one is kept')
+    arg_parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'cars-bench'),
+                            help='where generated catalogs are cached')
+    arg_parser.add_argument('--stream', action='store_true')
+    arg_parser.add_argument('--jobs', type=int, default=1)
+    arg_parser.add_argument('--format', default='insert')
+    arg_parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    arg_parser.add_argument('--save-baseline', action='store_true',
+                            help='store these results as the new baseline')
+    arg_parser.add_argument('--tolerance', type=float, default=0.10,
+                            help='allowed relative slowdown before a metric counts as a regression')
+    arg_parser.add_argument('--run-one', metavar='XML', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.run_one:
+        # Child mode: keep the parser's progress output off stdout's last line
+        metrics = run_once(args.run_one, args.stream, args.jobs, args.format)
+        print(json.dumps(metrics))
+        return
+
+    os.makedirs(args.workdir, exist_ok=True)
+
+    print("=" * 60)
+    print("⏱️  Cars XML Parser Benchmark")
+    print("=" * 60)
+
+    results = {}
+    for scale in (float(value) for value in args.scales.split(',')):
+        key = f"{scale:g}"
+        xml_file = ensure_catalog(args.workdir, scale, args.seed)
+        metrics = best_of([run_isolated(xml_file, args) for _ in range(args.repeat)])
+        results[key] = metrics
+        print(f"x{key}: {metrics['rows']} rows | "
+              f"parse {metrics['parse_rows_per_s']}/s, "
+              f"transform {metrics['transform_rows_per_s']}/s, "
+              f"dump {metrics['dump_rows_per_s']}/s | "
+              f"peak RSS {metrics[MEMORY_METRIC]} MB")
+
+    exit_code = 0
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    # Without a reference the run cannot catch anything, so say so and fail
+    missing = [f"x{scale}" for scale in results if scale not in baseline]
+    if missing and not args.save_baseline:
+        print(f"\n❌ No baseline for {', '.join(missing)} in {args.baseline}; "
+              f"record one with --save-baseline")
+        exit_code = 1
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\n❌ Regressions against baseline:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        exit_code = 1
+    elif len(missing) < len(results):
+        print("\n✅ No regressions against baseline")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Baseline saved: {args.baseline}")
+
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
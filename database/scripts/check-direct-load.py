@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Check the direct database load (--load) against the SQL dump: load a
+synthetic catalog through sqlite:// (and optionally PostgreSQL) and compare
+every table's row count with the COPY dump of the same parse
+"""
+
+import argparse
+import importlib.util
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from typing import Dict
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+COPY_LINE_RE = re.compile(r'^COPY "(\w+)"')
+
+
+def load_script(name: str):
+    """Import one of the hyphenated scripts next to this file"""
+    path = os.path.join(SCRIPTS_DIR, f"{name}.py")
+    module_name = name.replace('-', '_')
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def dump_counts(dump_file: str) -> Dict[str, int]:
+    """Rows per table in a --format copy dump: one line per row inside each COPY block"""
+    counts = {}
+    table = None
+    with open(dump_file, encoding='utf-8') as f:
+        for line in f:
+            if table is None:
+                match = COPY_LINE_RE.match(line)
+                if match:
+                    table = match.group(1)
+                    counts.setdefault(table, 0)
+            elif line == '\\.\n':
+                table = None
+            else:
+                counts[table] += 1
+    return counts
+
+
+def database_counts(connection, tables) -> Dict[str, int]:
+    return {table: connection.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in tables}
+
+
+def compare(name: str, expected: Dict[str, int], actual: Dict[str, int]) -> bool:
+    ok = True
+    for table, rows in expected.items():
+        loaded = actual.get(table)
+        mark = '✅' if loaded == rows else '❌'
+        ok = ok and loaded == rows
+        print(f"  {mark} {name} {table}: dump {rows}, loaded {loaded}")
+    return ok
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare a direct --load with the SQL dump')
+    arg_parser.add_argument('--scale', type=float, default=0.05,
+                            help='synthetic catalog size relative to cars.xml (default: 0.05)')
+    arg_parser.add_argument('--seed', type=int, default=42)
+    arg_parser.add_argument('--postgres', metavar='URL',
+                            help='also load into this postgresql://... database (its catalog tables are replaced)')
+    args = arg_parser.parse_args()
+
+    parser_module = load_script('parse-cars-xml')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        xml_file = os.path.join(tmp, 'cars.xml')
+        load_script('generate-cars-xml').generate(xml_file, args.scale, args.seed)
+
+        parser = parser_module.CarsXMLParser(xml_file)
+        parser.parse()
+        dump_file = os.path.join(tmp, 'dump.sql')
+        parser.generate_sql_dump(dump_file, fmt='copy')
+        expected = dump_counts(dump_file)
+        if set(expected) != set(parser_module.TABLE_COLUMNS):
+            sys.exit(f"❌ Dump tables differ from TABLE_COLUMNS: {sorted(expected)}")
+
+        # Four slashes: sqlite:/// followed by an absolute path
+        database_file = os.path.join(tmp, 'cars.db')
+        parser.load_into_database(f"sqlite:///{database_file}")
+        with sqlite3.connect(database_file) as connection:
+            ok = compare('sqlite', expected, database_counts(connection, expected))
+
+        if args.postgres:
+            parser.load_into_database(args.postgres)
+            with parser_module.psycopg.connect(args.postgres) as connection:
+                ok = compare('postgres', expected, database_counts(connection, expected)) and ok
+
+    if not ok:
+        sys.exit(1)
+    print("\n✅ Direct load matches the dump")
+
+
+if __name__ == '__main__':
+    main()
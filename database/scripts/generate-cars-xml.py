@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic cars.xml with the same <mark>/<folder>/<modification>
+shape as the real catalog, at a configurable scale
+"""
+
+import argparse
+import random
+from typing import List
+from xml.sax.saxutils import escape, quoteattr
+
+# Shape of the real cars.xml at scale 1
+BASE_BRANDS = 407
+BASE_MODELS = 9554
+BASE_MODIFICATIONS = 81823
+
+# The first ten cover every country the parser knows, so even a tiny catalog
+# references all countries used by the sample cities
+BRAND_NAMES = [
+    'Lada', 'Mercedes-Benz', 'Toyota', 'Ford', 'Hyundai', 'Chery', 'Renault', 'Ferrari', 'Bentley', 'Volvo',
+    'Honda', 'Nissan', 'Mazda', 'Subaru', 'Mitsubishi', 'Lexus', 'Suzuki', 'Isuzu',
+    'BMW', 'Audi', 'Volkswagen', 'Porsche', 'Opel',
+    'Chevrolet', 'Dodge', 'Jeep', 'Tesla', 'Cadillac', 'Chrysler',
+    'Kia', 'Genesis', 'Daewoo', 'Geely', 'BYD', 'Great Wall', 'Haval', 'Changan',
+    'Peugeot', 'Citroën', 'DS', 'Lamborghini', 'Maserati', 'Alfa Romeo', 'Fiat',
+    'Aston Martin', 'Rolls-Royce', 'Jaguar', 'Land Rover', 'McLaren',
+    'Saab', 'Koenigsegg', 'Polestar', 'ГАЗ', 'УАЗ', 'Москвич', 'Marussia', 'Bugatti',
+]
+COUNTRY_LEADERS = 10
+
+BODY_TYPES = [
+    'Седан', 'Внедорожник', 'Купе', 'Хэтчбек', 'Универсал', 'Кабриолет', 'Минивэн', 'Пикап',
+    'Лифтбек', 'Фургон', 'Родстер', 'Тарга', 'Кроссовер', 'Микроавтобус', 'Компактвэн',
+    'Внедорожник 3 дв.', 'Внедорожник 5 дв.', 'Хэтчбек 3 дв.', 'Хэтчбек 5 дв.', 'Спидстер',
+    'Фастбек', 'Лимузин', 'Шасси', 'Тентованный', 'Бортовой', 'Кабина', 'Седан 2 дв.',
+    'Универсал 3 дв.', 'Фаэтон',
+]
+
+TRANSMISSIONS = ['AT', 'MT', 'AMT', 'CVT', 'robot']
+DRIVES = ['', ' 4WD', ' FWD', ' RWD', ' 4X4']
+FUEL_SUFFIXES = ['', '', '', 'd', ' hyb']
+
+
+def modification_name(rng: random.Random) -> str:
+    """Build a name like '2.8d MT (177 л.с.) 4WD' from the catalog's vocabulary"""
+    if rng.random() < 0.02:
+        return f"Electric ({rng.randint(100, 1000)} л.с.){rng.choice(DRIVES)}"
+
+    volume = rng.choice([1.0, 1.2, 1.4, 1.5, 1.6, 1.8, 2.0, 2.0, 2.4, 2.5, 3.0, 3.5, 4.0, 5.0, 6.0])
+    power = int(volume * rng.randint(50, 140))
+    return (f"{volume}{rng.choice(FUEL_SUFFIXES)} {rng.choice(TRANSMISSIONS)} "
+            f"({power} л.с.){rng.choice(DRIVES)}")
+
+
+def years_range(rng: random.Random) -> str:
+    start = rng.randint(1960, 2024)
+    if start > 2018 and rng.random() < 0.5:
+        return f"{start} - по н.в."
+    return f"{start} - {min(start + rng.randint(1, 8), 2024)}"
+
+
+def split(total: int, parts: int, rng: random.Random) -> List[int]:
+    """Split total into parts skewed counts (at least 1 each) that sum exactly to total"""
+    weights = [rng.paretovariate(1.5) for _ in range(parts)]
+    weight_sum = sum(weights)
+    remaining = total - parts
+    counts = [1 + int(remaining * w / weight_sum) for w in weights]
+    for i in range(total - sum(counts)):
+        counts[i % parts] += 1
+    return counts
+
+
+def generate(output_file: str, scale: float = 1.0, seed: int = 42) -> int:
+    """Write a synthetic catalog and return the number of modifications"""
+    rng = random.Random(seed)
+    brand_count = max(COUNTRY_LEADERS, round(BASE_BRANDS * scale))
+    model_count = max(brand_count, round(BASE_MODELS * scale))
+    modification_count = max(model_count, round(BASE_MODIFICATIONS * scale))
+
+    models_per_brand = split(model_count, brand_count, rng)
+    modifications_per_model = iter(split(modification_count, model_count, rng))
+
+    folder_id = 0
+    modification_id = 0
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<catalog>\n')
+
+        for b in range(brand_count):
+            base_name = BRAND_NAMES[b % len(BRAND_NAMES)]
+            round_ = b // len(BRAND_NAMES)
+            brand_name = base_name if round_ == 0 else f"{base_name} {round_ + 1}"
+            f.write(f"  <mark name={quoteattr(brand_name)}>\n")
+            f.write(f"    <code>{escape(brand_name.upper().replace(' ', '_'))}</code>\n")
+
+            for m in range(models_per_brand[b]):
+                folder_id += 1
+                model_name = f"Model {m + 1}"
+                f.write(f"    <folder name={quoteattr(model_name)} id=\"{folder_id}\">\n")
+                f.write(f"      <model>{escape(brand_name.upper().replace(' ', '_'))}_{m + 1}</model>\n")
+
+                for _ in range(next(modifications_per_model)):
+                    modification_id += 1
+                    f.write(f"      <modification name={quoteattr(modification_name(rng))} id=\"{modification_id}\">\n")
+                    f.write(f"        <body_type>{escape(rng.choice(BODY_TYPES))}</body_type>\n")
+                    f.write(f"        <years>{escape(years_range(rng))}</years>\n")
+                    f.write("      </modification>\n")
+
+                f.write("    </folder>\n")
+
+            f.write("  </mark>\n")
+
+        f.write('</catalog>\n')
+
+    return modification_id
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Generate a synthetic cars.xml')
+    arg_parser.add_argument('output_file')
+    arg_parser.add_argument('--scale', type=float, default=1.0,
+                            help=f'size relative to the real catalog ({BASE_MODIFICATIONS} modifications)')
+    arg_parser.add_argument('--seed', type=int, default=42)
+    args = arg_parser.parse_args()
+
+    print(f"🔧 Generating synthetic catalog x{args.scale}: {args.output_file}")
+    count = generate(args.output_file, args.scale, args.seed)
+    print(f"✅ Written {count} modifications")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,12 +2,22 @@
 
 set -e
 
+# Dump file (default: full initial dump). A delta produced with
+# `parse-cars-xml.py --delta-from` or a brand patch produced with
+# `--brands ... --mark-index` is applied on top of existing data.
+DUMP_FILE="${1:-./database/dumps/initial-data.sql}"
+
+IS_DELTA=false
+if [ -f "$DUMP_FILE" ] && head -n 1 "$DUMP_FILE" | grep -qE "^-- Cars Database (Delta|Brand Patch)"; then
+    IS_DELTA=true
+fi
+
 echo "📥 Loading initial data dump into search_db..."
 
 # Check if database has data already
 DATA_COUNT=$(docker exec cars_postgres psql -U postgres search_db -t -c "SELECT COUNT(*) FROM \"Brand\";" 2>/dev/null || echo "0")
 
-if [ "$DATA_COUNT" -gt "0" ]; then
+if [ "$DATA_COUNT" -gt "0" ] && [ "$IS_DELTA" = false ]; then
     echo "⚠️  Database already contains data ($DATA_COUNT brands)"
     echo "   Do you want to reload? This will DELETE all existing data! (yes/no)"
     read CONFIRM
@@ -19,6 +29,8 @@ if [ "$DATA_COUNT" -gt "0" ]; then
 
     echo "🗑️  Clearing existing data..."
     docker exec cars_postgres psql -U postgres search_db -c "
+        TRUNCATE TABLE \"ModelStats\" CASCADE;
+        TRUNCATE TABLE \"SpecificationFacet\" CASCADE;
         TRUNCATE TABLE \"Specification\" CASCADE;
         TRUNCATE TABLE \"Model\" CASCADE;
         TRUNCATE TABLE \"Brand\" CASCADE;
@@ -32,8 +44,6 @@ if [ "$DATA_COUNT" -gt "0" ]; then
 fi
 
 # Check if dump file exists
-DUMP_FILE="./database/dumps/initial-data.sql"
-
 if [ ! -f "$DUMP_FILE" ]; then
     echo "❌ Dump file not found: $DUMP_FILE"
     echo "   Run 'node database/scripts/parse-cars-xml.js' first to generate the dump"
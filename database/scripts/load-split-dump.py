@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Load a split dump written by `parse-cars-xml.py --split` into search_db,
+restoring the files of each dependency stage concurrently
+"""
+
+import argparse
+import gzip
+import importlib.util
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from typing import Dict, List
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for .zst dumps
+    zstandard = None
+
+DEFAULT_PSQL = 'docker exec -i cars_postgres psql -U postgres search_db'
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_script(name: str):
+    """Import one of the hyphenated scripts next to this file"""
+    path = os.path.join(SCRIPTS_DIR, f"{name}.py")
+    module_name = name.replace('-', '_')
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# The manifest version and checksums come from the writer itself
+parser_module = load_script('parse-cars-xml')
+
+
+def read_sql(path: str) -> bytes:
+    """Decompressed contents of one dump file"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if path.endswith('.gz'):
+        return gzip.decompress(data)
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError("Loading .zst files needs the zstandard package: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data
+
+
+def psql(command: List[str], sql: bytes) -> str:
+    """Run SQL through one psql session and return its output; stop on the first error"""
+    result = subprocess.run(command + ['-v', 'ON_ERROR_STOP=1', '-q', '-t'],
+                            input=sql, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', 'replace').strip())
+    return result.stdout.decode('utf-8').strip()
+
+
+def load_file(command: List[str], dump_dir: str, entry: Dict) -> float:
+    start = time.perf_counter()
+    # Each file is its own transaction, so a failed chunk leaves nothing half-loaded
+    psql(command, b'BEGIN;\n' + read_sql(os.path.join(dump_dir, entry['file'])) + b'\nCOMMIT;\n')
+    return time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Load a split cars dump concurrently')
+    arg_parser.add_argument('dump_dir')
+    arg_parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                            help='files loaded at the same time (default: CPU count)')
+    arg_parser.add_argument('--psql', default=DEFAULT_PSQL,
+                            help=f'psql command reading SQL from stdin (default: {DEFAULT_PSQL})')
+    arg_parser.add_argument('--yes', action='store_true', help='replace existing data without asking')
+    args = arg_parser.parse_args()
+
+    command = shlex.split(args.psql)
+    with open(os.path.join(args.dump_dir, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != parser_module.SPLIT_MANIFEST_VERSION:
+        sys.exit(f"❌ Unsupported manifest version: {manifest.get('version')}")
+
+    print("🔍 Verifying checksums...")
+    for entry in manifest['files']:
+        if parser_module.file_digest(os.path.join(args.dump_dir, entry['file']), 'sha256') != entry['sha256']:
+            sys.exit(f"❌ Checksum mismatch: {entry['file']}")
+
+    brand_count = int(psql(command, b'SELECT COUNT(*) FROM "Brand";') or 0)
+    if brand_count and not args.yes:
+        print(f"⚠️  Database already contains data ({brand_count} brands)")
+        print("   Do you want to reload? This will DELETE all existing data! (yes/no)")
+        if input() != 'yes':
+            print("❌ Cancelled")
+            return
+
+    # Stages and table order come from the manifest: later stages reference
+    # earlier ones, so the tables are cleared children first
+    files = sorted(manifest['files'], key=lambda entry: entry['stage'])
+    tables = list(dict.fromkeys(entry['table'] for entry in reversed(files) if entry['table']))
+
+    print("🗑️  Clearing existing data...")
+    names = ', '.join(f'"{table}"' for table in tables)
+    psql(command, f'TRUNCATE TABLE {names} CASCADE;'.encode())
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max(1, args.jobs)) as pool:
+        for stage, entries in groupby(files, key=lambda entry: entry['stage']):
+            entries = list(entries)
+            print(f"📦 Stage {stage}: {', '.join(entry['file'] for entry in entries)}")
+            # list() waits for the whole stage and re-raises the first failure
+            list(pool.map(lambda entry: load_file(command, args.dump_dir, entry), entries))
+
+    rows = sum(entry['rows'] for entry in files)
+    print(f"\n✅ Loaded {rows} rows from {len(files)} files in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,318 +5,2211 @@ Parse cars.xml and generate SQL dump for database initialization
 
 import xml.etree.ElementTree as ET
 import re
+import bisect
 import json
-from typing import Dict, List, Set, Tuple
+import gzip
+import hashlib
+import io
+import itertools
+import mmap
+import multiprocessing
+import os
+import sqlite3
+import struct
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from types import MappingProxyType
+from typing import Callable, Dict, List, Set, Tuple
 from datetime import datetime
+from functools import lru_cache
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # optional: spec generation falls back to plain Python
+    np = None
+
+try:
+    import psycopg
+except ImportError:  # optional: only needed for --load postgresql://...
+    psycopg = None
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for --split --compress zstd
+    zstandard = None
+
+try:
+    import resource
+except ImportError:  # not available on Windows: reports go without peak RSS
+    resource = None
+
+
+def _peak_rss_mb():
+    """Peak resident set size of this process in MiB, or None where it cannot be read"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class PipelineStats:
+    """Wall time, CPU time and memory per pipeline phase, plus row counters.
+
+    Phases are exclusive within a process: xml_load, traversal,
+    name_parsing, spec_generation, formatting and file_writes never overlap,
+    so in a serial run their times add up to the whole run. With --jobs or
+    --feed the workers' phase times are merged in (see merge()) and summed
+    over all processes, so they add up to more than the wall time of the
+    run. Hot paths time batches (one <mark>, one write) rather than single
+    rows to keep the overhead negligible.
+
+    peak_rss_so_far_mb is the peak RSS of the process when the phase last
+    ended, so it includes every phase before it; only traced_peak_mb
+    (--trace-memory) is the phase's own peak.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, Dict] = {}
+        self.counters: Dict[str, int] = {}
+
+    def begin(self) -> Tuple[float, float]:
+        return time.perf_counter(), time.process_time()
+
+    def end(self, name: str, token: Tuple[float, float],
+            minus: Tuple[float, float] = (0.0, 0.0)) -> Tuple[float, float]:
+        """Add the time since token (less minus) to a phase and return a fresh token"""
+        now = self.begin()
+        self._add(name, now[0] - token[0] - minus[0], now[1] - token[1] - minus[1])
+
+        phase = self.phases[name]
+        peak_rss = _peak_rss_mb()
+        if peak_rss is not None:
+            phase['peak_rss_so_far_mb'] = peak_rss
+        if tracemalloc.is_tracing():
+            # The traced peak since the previous phase ended belongs to this one
+            peak = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+            phase['traced_peak_mb'] = max(phase.get('traced_peak_mb', 0.0), peak)
+            tracemalloc.reset_peak()
+        return now
+
+    @contextmanager
+    def phase(self, name: str):
+        token = self.begin()
+        yield
+        self.end(name, token)
+
+    def totals(self, name: str) -> Tuple[float, float]:
+        phase = self.phases.get(name)
+        return (phase['wall_s'], phase['cpu_s']) if phase else (0.0, 0.0)
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, other: 'PipelineStats'):
+        """Add phase times and counters measured in another process (e.g. a --jobs worker)"""
+        for name, phase in other.phases.items():
+            self._add(name, phase['wall_s'], phase['cpu_s'], phase['calls'])
+        for name, value in other.counters.items():
+            self.count(name, value)
+
+    def _add(self, name: str, wall: float, cpu: float, calls: int = 1):
+        phase = self.phases.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0})
+        phase['calls'] += calls
+        phase['wall_s'] += wall
+        phase['cpu_s'] += cpu
+
+    def report(self) -> Dict:
+        return {
+            'phases': {
+                name: dict(phase, wall_s=round(phase['wall_s'], 4), cpu_s=round(phase['cpu_s'], 4))
+                for name, phase in self.phases.items()
+            },
+            'counters': dict(self.counters),
+        }
 
-class CarsXMLParser:
-    def __init__(self, xml_file: str):
-        self.xml_file = xml_file
-        self.brands = []
-        self.models = []
-        self.modifications = []
-        self.body_types = set()
-        self.fuel_types = set()
-        self.transmissions = set()
-        self.drive_types = set()
-
-    def parse(self):
-        """Parse XML file and extract all data"""
-        print("🔄 Parsing cars.xml...")
-        tree = ET.parse(self.xml_file)
-        root = tree.getroot()
-
-        brand_id_counter = 1
-        model_id_counter = 1
-        modification_id_counter = 1
-
-        for mark in root.findall('.//mark'):
-            brand_name = mark.get('name')
-            brand_code = mark.find('code')
-            brand_code_text = brand_code.text if brand_code is not None else brand_name.upper()
-
-            # Add brand
-            brand_data = {
-                'id': brand_id_counter,
-                'name': brand_name,
-                'code': brand_code_text,
-                'country': self._guess_country(brand_name)
-            }
-            self.brands.append(brand_data)
 
-            # Parse models (folders)
-            for folder in mark.findall('.//folder'):
-                model_name = folder.get('name')
-                generation_id = folder.get('id')
+class _TimedFile:
+    """File wrapper that books the time spent in write() as file_writes"""
+
+    def __init__(self, f, stats: PipelineStats):
+        self._f = f
+        self._stats = stats
+
+    def write(self, data: str):
+        token = self._stats.begin()
+        self._f.write(data)
+        self._stats.end('file_writes', token)
 
-                model_element = folder.find('model')
-                model_code = model_element.text if model_element is not None else model_name
 
-                model_data = {
-                    'id': model_id_counter,
-                    'brand_id': brand_id_counter,
-                    'name': model_name,
-                    'code': model_code,
-                    'generation_id': generation_id
-                }
-                self.models.append(model_data)
+class DimensionRegistry:
+    """Interns values of one lookup table and hands out their integer ids.
+
+    Values are collected with add() while parsing. Ids follow the sorted
+    order of the values (or insertion order with sort=False) and are fixed
+    the first time they are requested, so every foreign-key lookup is a
+    single dict access. The registry also owns the matching sequence value
+    (sequence_value()), which keeps the table sequence in line with the ids
+    it handed out, whether it goes into a setval() call or a direct load.
+    """
+
+    def __init__(self, table: str, sort: bool = True):
+        self.table = table
+        self.sort = sort
+        self._ids: Dict[str, int] = {}
+        self._frozen = True
+
+    def add(self, value: str):
+        if value not in self._ids:
+            self._ids[value] = 0
+            self._frozen = False
+
+    def id_of(self, value: str) -> int:
+        if not self._frozen:
+            self._freeze()
+        return self._ids[value]
+
+    def items(self) -> List[Tuple[int, str]]:
+        """Return (id, value) pairs ordered by id"""
+        if not self._frozen:
+            self._freeze()
+        return [(id_, value) for value, id_ in self._ids.items()]
+
+    def sequence_value(self) -> Tuple[str, int]:
+        """(table, last id) to set the table's id sequence to"""
+        return self.table, len(self._ids)
+
+    def _freeze(self):
+        values = sorted(self._ids) if self.sort else list(self._ids)
+        self._ids = {value: i for i, value in enumerate(values, 1)}
+        self._frozen = True
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __contains__(self, value) -> bool:
+        return value in self._ids
+
+# Brand price tiers used by the spec formulas
+TIER_STANDARD = 0
+TIER_PREMIUM = 1
+TIER_LUXURY = 2
+
+# Leaf field of a <mark> record that no child element has set yet
+_UNSET = object()
+# Elements the <mark> traversal visits as nodes even when they have no children
+_BRANCH_TAGS = frozenset(('folder', 'modification'))
+
+BRAND_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'brand-rules.json')
+
+
+class BrandRules:
+    """Brand classification (country, price tier, popularity) compiled from a rules file.
+
+    The rules are turned into read-only lookup tables once; classify()
+    resolves each brand name a single time and caches the result.
+    """
+
+    TIERS = {'luxury': TIER_LUXURY, 'premium': TIER_PREMIUM}
+
+    def __init__(self, rules: Dict):
+        self.rules = rules
+        self.default_country = rules['default_country']
+        self.country_codes = MappingProxyType({
+            country: group['code'] for country, group in rules['countries'].items()
+        })
+        if self.default_country not in self.country_codes:
+            raise ValueError(f"default_country {self.default_country!r} is not listed in countries")
+
+        countries = {}
+        for country, group in rules['countries'].items():
+            for brand in group['brands']:
+                # Like the old if-chain, the first country listing a brand wins
+                countries.setdefault(brand, country)
+        self.countries = MappingProxyType(countries)
+
+        tiers = {}
+        for name in ('premium', 'luxury'):
+            # Luxury is assigned last so it wins over premium
+            tiers.update((brand, self.TIERS[name]) for brand in rules['tiers'].get(name, ()))
+        self.tiers = MappingProxyType(tiers)
+        self.popular = frozenset(rules['popular'])
+
+        canonical = json.dumps(rules, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        self.digest = hashlib.blake2b(canonical, digest_size=8).hexdigest()
+        self._classified: Dict[str, Tuple[str, int, bool]] = {}
+
+    @classmethod
+    def load(cls, path: str = BRAND_RULES_FILE) -> 'BrandRules':
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def classify(self, brand_name: str) -> Tuple[str, int, bool]:
+        """(country, tier, is popular) of a brand"""
+        result = self._classified.get(brand_name)
+        if result is None:
+            result = self._classified[brand_name] = (
+                self.countries.get(brand_name, self.default_country),
+                self.tiers.get(brand_name, TIER_STANDARD),
+                brand_name in self.popular,
+            )
+        return result
 
-                # Parse modifications
-                for modification in folder.findall('.//modification'):
-                    mod_name = modification.get('name')
-                    mod_id = modification.get('id')
+    def country_code(self, country: str) -> str:
+        return self.country_codes.get(country, self.country_codes[self.default_country])
+
+    def __reduce__(self):
+        # The compiled tables are not picklable; workers rebuild them from the rules
+        return BrandRules, (self.rules,)
+
+
+class ModificationStore:
+    """Column-oriented storage for modification rows.
+
+    Numeric fields live in typed arrays and categorical fields (body type,
+    fuel, transmission, drive) are stored as small integer codes into a
+    per-store value table, so a row costs a few dozen bytes instead of a
+    19-key dict. The spec columns (price_min ... maintenance_cost_per_year)
+    stay empty until CarsXMLParser._generate_specs fills them in one pass.
+    """
+
+    INT_COLUMNS = ('id', 'model_id', 'brand_id', 'horsepower', 'year_from', 'year_to')
+    FLOAT_COLUMNS = ('engine_volume',)
+    CATEGORY_COLUMNS = ('body_type', 'fuel_type', 'transmission', 'drive_type')
+    SPEC_INT_COLUMNS = ('price_min', 'price_max', 'max_speed')
+    SPEC_FLOAT_COLUMNS = ('fuel_consumption', 'acceleration_0_100', 'maintenance_cost_per_year')
+
+    def __init__(self):
+        self.columns = {}
+        for name in self.INT_COLUMNS + self.SPEC_INT_COLUMNS:
+            self.columns[name] = array('q')
+        for name in self.FLOAT_COLUMNS + self.SPEC_FLOAT_COLUMNS:
+            self.columns[name] = array('d')
+        for name in self.CATEGORY_COLUMNS:
+            self.columns[name] = array('H')
+        self.columns['tier'] = array('b')
+        self.names: List[str] = []
+        self.external_ids: List[str] = []
+        self.categories: Dict[str, List] = {name: [] for name in self.CATEGORY_COLUMNS}
+        self._codes: Dict[str, Dict] = {name: {} for name in self.CATEGORY_COLUMNS}
+
+    def append(self, id_: int, model_id: int, brand_id: int, name: str, external_id: str,
+               body_type: str, engine_info: Dict, year_from: int, year_to: int, tier: int):
+        columns = self.columns
+        columns['id'].append(id_)
+        columns['model_id'].append(model_id)
+        columns['brand_id'].append(brand_id)
+        columns['horsepower'].append(engine_info['power'])
+        columns['year_from'].append(year_from)
+        columns['year_to'].append(year_to)
+        columns['engine_volume'].append(engine_info['volume'])
+        columns['body_type'].append(self._code('body_type', body_type))
+        columns['fuel_type'].append(self._code('fuel_type', engine_info['fuel_type']))
+        columns['transmission'].append(self._code('transmission', engine_info['transmission']))
+        columns['drive_type'].append(self._code('drive_type', engine_info['drive_type']))
+        columns['tier'].append(tier)
+        self.names.append(name)
+        self.external_ids.append(external_id)
+
+    def extend(self, other: 'ModificationStore', id_offset: int, model_offset: int, brand_offset: int):
+        """Append the rows of another store, shifting its ids by the given offsets"""
+        offsets = {'id': id_offset, 'model_id': model_offset, 'brand_id': brand_offset}
+        for name, column in other.columns.items():
+            if name in offsets:
+                offset = offsets[name]
+                self.columns[name].extend(value + offset for value in column)
+            elif name in self._codes:
+                recode = [self._code(name, value) for value in other.categories[name]]
+                self.columns[name].extend(recode[code] for code in column)
+            else:
+                self.columns[name].extend(column)
+        self.names.extend(other.names)
+        self.external_ids.extend(other.external_ids)
+
+    def extend_rows(self, other: 'ModificationStore', rows: List[int], model_ids: Dict[int, int],
+                    model_brands: Dict[int, int]):
+        """Append the given rows of another store, numbered on from this one.
+
+        model_ids maps the other store's model ids to ours, and every row
+        takes the brand of its (mapped) model.
+        """
+        first_id = len(self) + 1
+        for name, column in other.columns.items():
+            if name == 'id':
+                self.columns[name].extend(range(first_id, first_id + len(rows)))
+            elif name == 'model_id':
+                self.columns[name].extend(model_ids[column[i]] for i in rows)
+            elif name == 'brand_id':
+                self.columns[name].extend(model_brands[model_ids[other.columns['model_id'][i]]] for i in rows)
+            elif name in self._codes:
+                recode = [self._code(name, value) for value in other.categories[name]]
+                self.columns[name].extend(recode[column[i]] for i in rows)
+            elif column:
+                self.columns[name].extend(column[i] for i in rows)
+        self.names.extend(other.names[i] for i in rows)
+        self.external_ids.extend(other.external_ids[i] for i in rows)
+
+    def decoded(self, name: str) -> List:
+        """Values of a categorical column, one per row"""
+        values = self.categories[name]
+        return [values[code] for code in self.columns[name]]
+
+    def _code(self, name: str, value) -> int:
+        codes = self._codes[name]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            self.categories[name].append(value)
+        return code
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self):
+        """Yield rows as dicts (slow path for inspection and debugging)"""
+        columns = self.columns
+        decoded = {name: self.decoded(name) for name in self.CATEGORY_COLUMNS}
+        for i in range(len(self)):
+            row = {name: column[i] for name, column in columns.items() if name != 'tier'}
+            row.update((name, values[i]) for name, values in decoded.items())
+            row['name'] = self.names[i]
+            row['external_id'] = self.external_ids[i]
+            if columns['tier'][i] != TIER_PREMIUM:
+                row['maintenance_cost_per_year'] = int(row['maintenance_cost_per_year'])
+            yield row
+
+
+# Bytes of <mark> elements sent to a worker process per task with --jobs;
+# a single larger <mark> makes a task on its own
+TASK_BYTES = 1 << 20
+
+# Bounded memo sizes for modification names and year ranges; both repeat
+# thousands of times across brands
+NAME_MEMO_SIZE = 16384
+YEARS_MEMO_SIZE = 1024
+
+# The regex parts of _tokenize_modification_name; every other token is a
+# plain substring test, which is much cheaper than one regex scanning the
+# name at every position
+VOLUME_RE = re.compile(r'\d+\.\d+')
+POWER_RE = re.compile(r'(\d+)\s*л\.с\.')
+DIESEL_RE = re.compile(r'\d+\.\d+d')
+YEAR_RE = re.compile(r'\d{4}')
+
+
+@lru_cache(maxsize=NAME_MEMO_SIZE)
+def _tokenize_modification_name(mod_name: str) -> Tuple:
+    """Return (volume, power, fuel_type, transmission, drive_type) for a name"""
+    volume_match = VOLUME_RE.search(mod_name)
+    power_match = POWER_RE.search(mod_name) if 'л.с.' in mod_name else None
+
+    # Fuel markers are matched case-insensitively
+    lowered = mod_name.lower()
+    if 'd' in lowered and DIESEL_RE.search(lowered):
+        fuel_type = 'Дизель'
+    elif 'hyb' in lowered:
+        fuel_type = 'Гибрид'
+    elif 'electric' in lowered or 'ev' in lowered:
+        fuel_type = 'Электро'
+    else:
+        fuel_type = 'Бензин'
+
+    # AT, AMT and CVT win over MT; without any marker the default is AT
+    transmission = 'MT' if 'MT' in mod_name and not ('AT' in mod_name or 'AMT' in mod_name
+                                                     or 'CVT' in mod_name) else 'AT'
+
+    if '4WD' in mod_name or '4X4' in mod_name:
+        drive_type = '4WD'
+    elif 'FWD' in mod_name:
+        drive_type = 'FWD'
+    elif 'RWD' in mod_name or 'RR' in mod_name:
+        drive_type = 'RWD'
+    else:
+        drive_type = None
+
+    return (
+        float(volume_match.group()) if volume_match else 2.0,
+        int(power_match.group(1)) if power_match else 150,
+        fuel_type,
+        transmission,
+        drive_type
+    )
+
+
+@lru_cache(maxsize=YEARS_MEMO_SIZE)
+def _split_years(years_str: str, current_year: int) -> Tuple[int, int]:
+    """Return (year_from, year_to) for a range like '2010 - 2014'"""
+    # Default range
+    year_from = current_year - 4
+    year_to = current_year
+
+    if not years_str:
+        return year_from, year_to
 
-                    body_type_elem = modification.find('body_type')
-                    years_elem = modification.find('years')
+    years = YEAR_RE.findall(years_str)
+    if years:
+        year_from = int(years[0])
+
+    # 'по н.в.' (up to now) keeps the current year as the end
+    if 'н.в.' not in years_str and len(years) >= 2:
+        year_to = int(years[1])
+
+    return year_from, year_to
+
+
+def _round1(values):
+    """Round a NumPy array to one decimal exactly like round(x, 1)
+
+    rint(x * 10) can disagree with Python's correctly rounded result when
+    the scaled value lands next to a .5 tie, so those few elements are
+    redone with round().
+    """
+    scaled = values * 10
+    rounded = np.rint(scaled) / 10
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(values[i]), 1)
+    return rounded
+
+
+def _memo_counters() -> Dict[str, Tuple[int, int]]:
+    """Current (hits, misses) of the parsing memos in this process"""
+    names = _tokenize_modification_name.cache_info()
+    years = _split_years.cache_info()
+    return {
+        'modification_names': (names.hits, names.misses),
+        'years': (years.hits, years.misses),
+    }
+
+
+def _memo_delta(before: Dict[str, Tuple[int, int]]) -> Dict[str, Tuple[int, int]]:
+    """(hits, misses) of the parsing memos since the before snapshot"""
+    return {
+        name: (hits - before[name][0], misses - before[name][1])
+        for name, (hits, misses) in _memo_counters().items()
+    }
+
+
+# Column lists of the search_db tables in dump order. Kinds drive value
+# formatting: int, num, text and bool come from the row tuples, while
+# 'now' columns are filled in by the writer itself.
+TABLE_COLUMNS = {
+    'Country': [('id', 'int'), ('name', 'text'), ('code', 'text'),
+                ('"createdAt"', 'now'), ('"updatedAt"', 'now')],
+    'City': [('id', 'int'), ('name', 'text'), ('"countryId"', 'int'),
+             ('"createdAt"', 'now'), ('"updatedAt"', 'now')],
+    'BodyType': [('id', 'int'), ('name', 'text'), ('"createdAt"', 'now'), ('"updatedAt"', 'now')],
+    'FuelType': [('id', 'int'), ('name', 'text'), ('"createdAt"', 'now'), ('"updatedAt"', 'now')],
+    'Transmission': [('id', 'int'), ('name', 'text'), ('"createdAt"', 'now'), ('"updatedAt"', 'now')],
+    'DriveType': [('id', 'int'), ('name', 'text'), ('"createdAt"', 'now'), ('"updatedAt"', 'now')],
+    'Brand': [('id', 'int'), ('name', 'text'), ('code', 'text'), ('country', 'text'),
+              ('logo', 'text'), ('"isPopular"', 'bool'),
+              ('"createdAt"', 'now'), ('"updatedAt"', 'now')],
+    'Model': [('id', 'int'), ('name', 'text'), ('code', 'text'), ('"brandId"', 'int'),
+              ('"generationId"', 'text'), ('image', 'text'),
+              ('"createdAt"', 'now'), ('"updatedAt"', 'now')],
+    'Specification': [('id', 'int'), ('"modelId"', 'int'), ('"brandId"', 'int'), ('name', 'text'),
+                      ('"externalId"', 'text'), ('"bodyTypeId"', 'int'), ('"engineVolume"', 'num'),
+                      ('horsepower', 'int'), ('"fuelTypeId"', 'int'), ('"transmissionId"', 'int'),
+                      ('"driveTypeId"', 'int'), ('"yearFrom"', 'int'), ('"yearTo"', 'int'),
+                      ('"priceMin"', 'int'), ('"priceMax"', 'int'), ('"fuelConsumption"', 'num'),
+                      ('"acceleration0to100"', 'num'), ('"maxSpeed"', 'int'),
+                      ('"maintenanceCostPerYear"', 'int'),
+                      ('"createdAt"', 'now'), ('"updatedAt"', 'now')],
+    'ModelStats': [('"modelId"', 'int'), ('"brandId"', 'int'), ('"specCount"', 'int'),
+                   ('"priceMin"', 'int'), ('"priceMax"', 'int'), ('"yearFrom"', 'int'), ('"yearTo"', 'int'),
+                   ('"horsepowerMin"', 'int'), ('"horsepowerMax"', 'int'),
+                   ('"createdAt"', 'now'), ('"updatedAt"', 'now')],
+    'SpecificationFacet': [('id', 'int'), ('"brandId"', 'int'), ('"bodyTypeId"', 'int'),
+                           ('"fuelTypeId"', 'int'), ('"transmissionId"', 'int'), ('"specCount"', 'int'),
+                           ('"priceMin"', 'int'), ('"priceMax"', 'int'),
+                           ('"createdAt"', 'now'), ('"updatedAt"', 'now')],
+}
+
+# Tables derived from Specification; they have no foreign keys. A delta
+# upserts the groups that changed, by the natural key columns below
+AGGREGATE_TABLES = ('ModelStats', 'SpecificationFacet')
+AGGREGATE_KEYS = {
+    'ModelStats': slice(0, 1),          # modelId
+    'SpecificationFacet': slice(1, 5),  # brandId, bodyTypeId, fuelTypeId, transmissionId
+}
+
+
+# Brand and Model rows are rebuilt for every output of a run (dump, manifest,
+# delta, split files), so their CDN URLs are built once per code
+@lru_cache(maxsize=None)
+def _brand_logo_url(code: str) -> str:
+    return f"https://cdn.example.com/brands/{code.lower()}.png"
+
+
+@lru_cache(maxsize=None)
+def _model_image_url(code: str) -> str:
+    return f"https://cdn.example.com/models/{code.lower()}.png"
+
+
+def _compile_row_format(kinds: List[str], separator: str, prefix: str, tail: str,
+                        converters: Dict[str, Callable]) -> Tuple[str, Tuple[Tuple[int, Callable], ...]]:
+    """Row template with one %s per value, plus the (position, converter) pairs to apply first.
+
+    Columns whose kind has no converter are formatted by % itself, which
+    gives str(value) without a Python-level call per value.
+    """
+    template = prefix + separator.join('%s' for _ in kinds) + tail.replace('%', '%%')
+    return template, tuple((i, converters[kind]) for i, kind in enumerate(kinds) if kind in converters)
+
+
+def _format_rows(rows, template: str, converted: Tuple[Tuple[int, Callable], ...],
+                 slow_path: Callable, out: List[str]):
+    """Append one formatted string per row to out.
+
+    Rows with a NULL go through slow_path, which formats value by value;
+    % would print them as None.
+    """
+    append = out.append
+    for row in rows:
+        if None in row:
+            append(slow_path(row))
+        elif converted:
+            values = list(row)
+            for i, convert in converted:
+                values[i] = convert(values[i])
+            append(template % tuple(values))
+        else:
+            append(template % tuple(row))
 
-                    body_type = body_type_elem.text if body_type_elem is not None else 'Седан'
-                    years = years_elem.text if years_elem is not None else '2020 - 2024'
 
-                    self.body_types.add(body_type)
+def _sql_literal(value) -> str:
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, str):
+        return _sql_text(value)
+    return str(value)
 
-                    # Extract technical specs from modification name
-                    engine_info = self._parse_modification_name(mod_name)
 
-                    self.fuel_types.add(engine_info['fuel_type'])
-                    self.transmissions.add(engine_info['transmission'])
-                    if engine_info['drive_type']:
-                        self.drive_types.add(engine_info['drive_type'])
+def _sql_text(value) -> str:
+    """Quoted literal for a text column; strings without quotes are not rescanned"""
+    if value.__class__ is not str:
+        return _sql_literal(value)
+    if "'" in value:
+        value = value.replace("'", "''")
+    return "'" + value + "'"
 
-                    # Parse years
-                    year_from, year_to = self._parse_years(years)
 
-                    # Generate realistic prices and specs
-                    specs = self._generate_specs(brand_name, engine_info, body_type, year_from)
+# Converters applied before % for INSERT rows; other kinds print as str(value)
+_SQL_CONVERTERS = {'text': _sql_text, 'bool': _sql_literal}
 
-                    modification_data = {
-                        'id': modification_id_counter,
-                        'model_id': model_id_counter,
-                        'brand_id': brand_id_counter,
-                        'name': mod_name,
-                        'external_id': mod_id,
-                        'body_type': body_type,
-                        'engine_volume': engine_info['volume'],
-                        'horsepower': engine_info['power'],
-                        'fuel_type': engine_info['fuel_type'],
-                        'transmission': engine_info['transmission'],
-                        'drive_type': engine_info['drive_type'],
-                        'year_from': year_from,
-                        'year_to': year_to,
-                        'price_min': specs['price_min'],
-                        'price_max': specs['price_max'],
-                        'fuel_consumption': specs['fuel_consumption'],
-                        'acceleration_0_100': specs['acceleration'],
-                        'max_speed': specs['max_speed'],
-                        'maintenance_cost_per_year': specs['maintenance_cost']
-                    }
-                    self.modifications.append(modification_data)
-                    modification_id_counter += 1
 
-                model_id_counter += 1
+class InsertDumpWriter:
+    """Writes table rows as multi-row INSERT ... VALUES statements.
 
-            brand_id_counter += 1
+    Rows are formatted through a per-table template and collected in one
+    reused buffer per statement.
+    """
 
-        print(f"✅ Parsed: {len(self.brands)} brands, {len(self.models)} models, {len(self.modifications)} modifications")
+    batch_size = 1000
 
-    def _parse_modification_name(self, mod_name: str) -> Dict:
-        """Extract engine specs from modification name like '2.8d MT (177 л.с.) 4WD'"""
-        result = {
-            'volume': 2.0,
-            'power': 150,
-            'fuel_type': 'Бензин',
-            'transmission': 'MT',
-            'drive_type': None
-        }
+    def __init__(self, f):
+        self.f = f
+        self._lines: List[str] = []
 
-        # Engine volume (e.g., "2.8", "3.5", "5.0")
-        volume_match = re.search(r'(\d+\.\d+)', mod_name)
-        if volume_match:
-            result['volume'] = float(volume_match.group(1))
-
-        # Horsepower (e.g., "177 л.с.", "888 л.с.")
-        power_match = re.search(r'(\d+)\s*л\.с\.', mod_name)
-        if power_match:
-            result['power'] = int(power_match.group(1))
-
-        # Fuel type
-        if 'd' in mod_name.lower() and re.search(r'\d+\.\d+d', mod_name.lower()):
-            result['fuel_type'] = 'Дизель'
-        elif 'hyb' in mod_name.lower():
-            result['fuel_type'] = 'Гибрид'
-        elif 'electric' in mod_name.lower() or 'ev' in mod_name.lower():
-            result['fuel_type'] = 'Электро'
-        else:
-            result['fuel_type'] = 'Бензин'
+    def write_table(self, table: str, rows: List[tuple], batched: bool = False, upsert: bool = False):
+        """Write rows of one table; upsert=True updates rows whose primary key already exists"""
+        if not rows:
+            return
 
-        # Transmission
-        if 'AT' in mod_name or 'AMT' in mod_name or 'CVT' in mod_name:
-            result['transmission'] = 'AT'
-        elif 'MT' in mod_name:
-            result['transmission'] = 'MT'
-        else:
-            result['transmission'] = 'AT'  # Default
+        columns = TABLE_COLUMNS[table]
+        now_count = sum(1 for _, kind in columns if kind == 'now')
+        header = f'INSERT INTO "{table}" ({", ".join(name for name, _ in columns)}) VALUES\n'
+        self._tail = ''.join(', NOW()' for _ in range(now_count)) + ')'
+        template, converted = _compile_row_format(
+            [kind for _, kind in columns if kind != 'now'], ', ', '(', self._tail, _SQL_CONVERTERS
+        )
+        end = ";\n\n"
+        if upsert:
+            # The first column is the primary key (ModelStats has "modelId")
+            key = columns[0][0]
+            updates = ', '.join(f'{name} = EXCLUDED.{name}' for name, _ in columns
+                                if name not in (key, '"createdAt"'))
+            end = f"\nON CONFLICT ({key}) DO UPDATE SET {updates};\n\n"
+
+        lines = self._lines
+        step = self.batch_size if batched else len(rows)
+        for i in range(0, len(rows), step):
+            _format_rows(rows[i:i+step], template, converted, self._format_row, lines)
+            self.f.write(header + ",\n".join(lines) + end)
+            lines.clear()
+
+    def _format_row(self, row: tuple) -> str:
+        return '(' + ', '.join(_sql_literal(value) for value in row) + self._tail
+
+
+_COPY_TEXT_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+_COPY_SPECIAL = re.compile(r'[\\\t\n\r]')
+
+
+def _copy_text(value) -> str:
+    """COPY text field; only strings with a backslash or control character are translated"""
+    value = str(value)
+    if _COPY_SPECIAL.search(value):
+        return value.translate(_COPY_TEXT_ESCAPES)
+    return value
+
+
+def _copy_int(value) -> int:
+    return value if value.__class__ is int else _round_half_up(value)
+
+
+# Converters applied before % for COPY rows; other kinds print as str(value)
+_COPY_CONVERTERS = {'text': _copy_text, 'bool': lambda value: 't' if value else 'f', 'int': _copy_int}
+
+
+class CopyDumpWriter:
+    """Writes table rows as COPY ... FROM stdin blocks in text format.
+
+    COPY cannot evaluate NOW(), so timestamp columns get the time the writer
+    was created. Integer columns are rounded the way Postgres casts the
+    numeric literals of the INSERT dump (half away from zero).
+    """
+
+    batch_size = 1000
+
+    def __init__(self, f):
+        self.f = f
+        self.timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self._lines: List[str] = []
+
+    def write_table(self, table: str, rows: List[tuple], batched: bool = False):
+        if not rows:
+            return
+
+        self.begin_table(table)
+        self.f.write(self.copy_sql + ';\n')
+        for i in range(0, len(rows), self.batch_size):
+            self.f.write(self.format_rows(rows[i:i+self.batch_size]))
+        self.f.write('\\.\n\n')
+
+    def begin_table(self, table: str):
+        """Set the table that format_rows() formats rows for"""
+        columns = TABLE_COLUMNS[table]
+        self._kinds = [kind for _, kind in columns if kind != 'now']
+        self._tail = ''.join('\t' + self.timestamp for _, kind in columns if kind == 'now') + '\n'
+        self._template, self._converted = _compile_row_format(self._kinds, '\t', '', self._tail, _COPY_CONVERTERS)
+        self.copy_sql = f'COPY "{table}" ({", ".join(name for name, _ in columns)}) FROM stdin'
+
+    def format_rows(self, rows) -> str:
+        """COPY text lines for rows of the table set by begin_table()"""
+        lines = self._lines
+        _format_rows(rows, self._template, self._converted, self._format_row, lines)
+        text = ''.join(lines)
+        lines.clear()
+        return text
+
+    def _format_row(self, row: tuple) -> str:
+        return '\t'.join(self._field(value, kind) for value, kind in zip(row, self._kinds)) + self._tail
+
+    def _field(self, value, kind: str) -> str:
+        if value is None:
+            return '\\N'
+        converter = _COPY_CONVERTERS.get(kind)
+        return str(converter(value) if converter else value)
+
+
+def _round_half_up(value: float) -> int:
+    """Round the way Postgres casts a numeric literal to an integer column.
+
+    A float's fractional part is exact, so comparing it with 0.5 gives the
+    same result as rounding its decimal repr, without building a Decimal.
+    """
+    whole = int(value)
+    fraction = value - whole
+    if fraction >= 0.5:
+        return whole + 1
+    if fraction <= -0.5:
+        return whole - 1
+    return whole
+
+
+# Natural key column (index into the row tuple) of the tables tracked in a
+# manifest; reference tables are small and always rewritten by a delta
+MANIFEST_KEYS = {
+    'Brand': 2,           # code
+    'Model': 4,           # generationId
+    'Specification': 4,   # externalId
+}
+MANIFEST_VERSION = 2
+
+
+def _fingerprint(row: tuple) -> str:
+    """Content hash of a dump row, foreign keys included"""
+    return hashlib.blake2b(repr(row).encode('utf-8'), digest_size=8).hexdigest()
+
+
+# Snapshot of the parsed data before spec generation (see --snapshot). Bump
+# SNAPSHOT_VERSION whenever parsing changes what ends up in brands, models,
+# registries or modification columns, so stale snapshots are re-parsed.
+SNAPSHOT_MAGIC = b'CARSNAP\x00'
+SNAPSHOT_VERSION = 3
+SNAPSHOT_COLUMNS = (ModificationStore.INT_COLUMNS + ModificationStore.FLOAT_COLUMNS +
+                    ModificationStore.CATEGORY_COLUMNS + ('tier',))
 
-        # Drive type
-        if '4WD' in mod_name or '4X4' in mod_name:
-            result['drive_type'] = '4WD'
-        elif 'FWD' in mod_name:
-            result['drive_type'] = 'FWD'
-        elif 'RWD' in mod_name or 'RR' in mod_name:
-            result['drive_type'] = 'RWD'
 
+# Filter index (see --filter-index): Specification row positions of the
+# range fields and of the dimension foreign keys
+FILTER_INDEX_MAGIC = b'CARFIDX\x00'
+FILTER_INDEX_VERSION = 2
+FILTER_RANGE_FIELDS = {'priceMin': 13, 'priceMax': 14, 'horsepower': 7, 'yearFrom': 11, 'yearTo': 12}
+FILTER_DIMENSIONS = {'brand': 2, 'bodyType': 5, 'fuelType': 8, 'transmission': 9, 'driveType': 10}
+
+
+def _write_sections(path: str, magic: bytes, header: Dict, sections: Dict[str, array]):
+    """Write a binary file of typed arrays that can be memory-mapped back.
+
+    Layout: magic, header length (u64 LE), JSON header with a 'sections'
+    directory of [typecode, offset, count] added, then the raw bytes of
+    every array at an 8-byte aligned offset. The file is written next to
+    path and renamed, so a crash never leaves half a file behind.
+    """
+    directory = {}
+    offset = 0
+    for name, values in sections.items():
+        directory[name] = [values.typecode, offset, len(values)]
+        offset += -(-len(values) * values.itemsize // 8) * 8
+
+    encoded = json.dumps(dict(header, sections=directory), ensure_ascii=False).encode('utf-8')
+    encoded += b' ' * (-len(encoded) % 8)
+
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(magic)
+        f.write(struct.pack('<Q', len(encoded)))
+        f.write(encoded)
+        for values in sections.values():
+            data = values.tobytes()
+            f.write(data)
+            f.write(b'\0' * (-len(data) % 8))
+    os.replace(tmp_file, path)
+
+
+def _map_sections(path: str, magic: bytes):
+    """Read a _write_sections() file as (header, {name: memoryview}); None if the magic differs"""
+    with open(path, 'rb') as f:
+        if f.read(len(magic)) != magic:
+            return None
+        header_size, = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_size))
+        data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    data = data[len(magic) + 8 + header_size:]
+    sections = {}
+    for name, (typecode, offset, count) in header.get('sections', {}).items():
+        size = count * array(typecode).itemsize
+        sections[name] = data[offset:offset + size].cast(typecode)
+    return header, sections
+
+
+def file_digest(path: str, algorithm: str = 'blake2b') -> str:
+    """Content hash of a file, read in 1 MiB blocks (also checks split dumps in load-split-dump.py)"""
+    digest = hashlib.blake2b(digest_size=16) if algorithm == 'blake2b' else hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Mark index (see --mark-index): where each <mark> sits in the XML and which
+# ids its rows were given by natural key, for re-parsing single brands
+MARK_INDEX_VERSION = 2
+
+
+def _source_stamp(path: str) -> List[int]:
+    """Size and modification time of a file, to notice that it changed"""
+    info = os.stat(path)
+    return [info.st_size, info.st_mtime_ns]
+
+
+def _keyed_ids(keys, ids) -> Dict[str, int]:
+    """Map the natural keys of one brand's rows to their ids (repeats told apart by _unique_keys)"""
+    return dict(zip(_unique_keys(keys), ids))
+
+
+def _aggregate_key(row: tuple, key_columns: slice) -> str:
+    """Manifest key of a ModelStats or SpecificationFacet row"""
+    return ','.join(map(str, row[key_columns]))
+
+
+def _facet_key(row: tuple) -> str:
+    """Natural key of a SpecificationFacet row within its brand: body type, fuel and transmission ids"""
+    return ','.join(map(str, row[2:5]))
+
+
+def _write_json(path: str, data: Dict):
+    """Write JSON next to path and rename it into place"""
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_file, path)
+
+
+def _unique_keys(keys) -> List[str]:
+    """Keys as strings, with repeats told apart as key#2, key#3, ... in document order"""
+    seen = set()
+    result = []
+    for key in map(str, keys):
+        unique = key
+        n = 2
+        while unique in seen:
+            unique = f"{key}#{n}"
+            n += 1
+        seen.add(unique)
+        result.append(unique)
+    return result
+
+
+ID_MAP_VERSION = 1
+# Stable ids are hashed into 1..STABLE_ID_SPACE; the upper half of int4 stays
+# free for rows the services insert through the sequences
+STABLE_ID_SPACE = (1 << 30) - 1
+
+
+def _stable_id(table: str, key: str) -> int:
+    digest = hashlib.blake2b(f"{table}:{key}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') % STABLE_ID_SPACE + 1
+
+
+class IdMap:
+    """Persistent natural key -> id assignments for Brand, Model and Specification.
+
+    A new key gets an id hashed from its table and key, probing upwards past
+    ids that are already taken, so ids do not depend on document order. Every
+    assignment is recorded and kept after its row disappears: an id always
+    means the same row, and a row that comes back gets its old id.
+    """
+
+    def __init__(self, tables: Dict[str, Dict[str, int]] = None):
+        self.tables = tables if tables is not None else {}
+        self.new_keys = 0
+        self.collisions = 0
+
+    @classmethod
+    def load(cls, path: str) -> 'IdMap':
+        """Read a saved map; a missing file starts an empty one"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != ID_MAP_VERSION:
+            raise ValueError(f"Unsupported id map version: {data.get('version')}")
+        return cls(data['tables'])
+
+    def save(self, path: str):
+        _write_json(path, {'version': ID_MAP_VERSION, 'tables': self.tables})
+
+    def assign(self, table: str, keys: List[str]) -> List[int]:
+        """Ids of the given unique keys, adding the new ones to the map"""
+        ids = self.tables.setdefault(table, {})
+        taken = set(ids.values())
+        result = []
+        for key in keys:
+            id_ = ids.get(key)
+            if id_ is None:
+                id_ = _stable_id(table, key)
+                if id_ in taken:
+                    self.collisions += 1
+                    while id_ in taken:
+                        id_ = id_ % STABLE_ID_SPACE + 1
+                ids[key] = id_
+                taken.add(id_)
+                self.new_keys += 1
+            result.append(id_)
         return result
 
-    def _parse_years(self, years_str: str) -> Tuple[int, int]:
-        """Parse year range like '2010 - 2014' or '2024 - по н.в.'"""
-        # Default range
-        current_year = datetime.now().year
-        year_from = current_year - 4
-        year_to = current_year
-
-        if not years_str:
-            return year_from, year_to
-
-        # Extract start year
-        start_match = re.search(r'(\d{4})', years_str)
-        if start_match:
-            year_from = int(start_match.group(1))
-
-        # Extract end year
-        if 'по н.в.' in years_str or 'н.в.' in years_str:
-            year_to = current_year
-        else:
-            end_match = re.findall(r'(\d{4})', years_str)
-            if len(end_match) >= 2:
-                year_to = int(end_match[1])
 
-        return year_from, year_to
+DUMP_WRITERS = {
+    'insert': InsertDumpWriter,
+    'copy': CopyDumpWriter,
+}
+
+# Foreign keys between dump tables; a split dump loads a table only after
+# everything it references
+TABLE_DEPENDENCIES = {
+    'City': ('Country',),
+    'Model': ('Brand',),
+    'Specification': ('Model', 'Brand', 'BodyType', 'FuelType', 'Transmission', 'DriveType'),
+}
+SPLIT_MANIFEST_VERSION = 1
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst', 'none': ''}
+
+
+def _load_stage(table: str) -> int:
+    """0 for tables without dependencies, else one more than the deepest one"""
+    return 1 + max((_load_stage(parent) for parent in TABLE_DEPENDENCIES.get(table, ())), default=-1)
+
+
+def _open_compressed(path: str, compression: str):
+    """Open a text file for writing, compressed with gzip, zstd or not at all"""
+    if compression == 'gzip':
+        return gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstd compression needs the zstandard package: pip install zstandard")
+        return io.TextIOWrapper(zstandard.ZstdCompressor(level=10).stream_writer(open(path, 'wb')),
+                                encoding='utf-8')
+    return open(path, 'w', encoding='utf-8')
+
+
+class _DatabaseLoader:
+    """Loads dump tables straight into a database over one connection.
+
+    Everything from reset() to set_sequences() runs in one transaction that
+    is committed when the with-block exits cleanly and rolled back
+    otherwise, so a failed load leaves the previous data in place.
+    """
+
+    batch_size = 1000
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.connection.commit()
+            else:
+                self.connection.rollback()
+        finally:
+            self.connection.close()
+
+    def create_indexes(self, definitions: List[str]):
+        for definition in definitions:
+            self.connection.execute(definition)
+
+
+class PostgresLoader(_DatabaseLoader):
+    """Streams rows into Postgres with COPY FROM STDIN, one COPY per table"""
+
+    def __init__(self, url: str):
+        if psycopg is None:
+            raise RuntimeError("Loading into Postgres needs psycopg: pip install 'psycopg[binary]'")
+        self.connection = psycopg.connect(url)
+        self._formatter = CopyDumpWriter(None)
+
+    def reset(self, tables: List[str]):
+        names = ', '.join(f'"{table}"' for table in tables)
+        self.connection.execute(f'TRUNCATE TABLE {names} CASCADE')
+
+    def drop_indexes(self, table: str) -> List[str]:
+        """Drop the indexes of a table that back no constraint and return their definitions"""
+        indexes = self.connection.execute(
+            "SELECT indexname, indexdef FROM pg_indexes"
+            " WHERE schemaname = current_schema() AND tablename = %s"
+            " AND indexname NOT IN (SELECT conname FROM pg_constraint)",
+            (table,)
+        ).fetchall()
+        for name, _ in indexes:
+            self.connection.execute(f'DROP INDEX "{name}"')
+        return [definition for _, definition in indexes]
+
+    def write_table(self, table: str, rows: List[tuple], batched: bool = False):
+        if not rows:
+            return
+
+        formatter = self._formatter
+        formatter.begin_table(table)
+        with self.connection.cursor() as cursor, cursor.copy(formatter.copy_sql) as copy:
+            for i in range(0, len(rows), self.batch_size):
+                copy.write(formatter.format_rows(rows[i:i+self.batch_size]))
+
+    def set_sequences(self, values: List[Tuple[str, int]]):
+        for table, last_id in values:
+            self.connection.execute("SELECT setval(%s, %s, true)", (f'"{table}_id_seq"', last_id))
+
+
+class SqliteLoader(_DatabaseLoader):
+    """Stand-in for PostgresLoader on a local SQLite file.
+
+    Lets the direct-load path run without a Postgres server. Missing tables,
+    the Specification indexes and the unique Country code of the search
+    schema are created first.
+    SQLite has no COPY, so rows go through executemany().
+    """
+
+    INDEXES = [
+        'CREATE INDEX IF NOT EXISTS "Specification_modelId_idx" ON "Specification" ("modelId")',
+        'CREATE INDEX IF NOT EXISTS "Specification_brandId_idx" ON "Specification" ("brandId")',
+        'CREATE INDEX IF NOT EXISTS "Specification_bodyTypeId_fuelTypeId_idx"'
+        ' ON "Specification" ("bodyTypeId", "fuelTypeId")',
+        'CREATE UNIQUE INDEX IF NOT EXISTS "Country_code_key" ON "Country" (code)',
+    ]
+
+    def __init__(self, path: str):
+        # Manage transactions by hand so index DDL joins the load transaction
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        for table, columns in TABLE_COLUMNS.items():
+            # The first column is the primary key, as in the search schema
+            definitions = ', '.join([f'{columns[0][0]} INTEGER PRIMARY KEY'] + [name for name, _ in columns[1:]])
+            self.connection.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({definitions})')
+        for definition in self.INDEXES:
+            self.connection.execute(definition)
+        self.connection.execute('BEGIN')
+        self.timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def reset(self, tables: List[str]):
+        for table in tables:
+            self.connection.execute(f'DELETE FROM "{table}"')
+
+    def drop_indexes(self, table: str) -> List[str]:
+        indexes = self.connection.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (table,)
+        ).fetchall()
+        for name, _ in indexes:
+            self.connection.execute(f'DROP INDEX "{name}"')
+        return [definition for _, definition in indexes]
+
+    def write_table(self, table: str, rows: List[tuple], batched: bool = False):
+        columns = TABLE_COLUMNS[table]
+        kinds = [kind for _, kind in columns if kind != 'now']
+        now = tuple(self.timestamp for _, kind in columns if kind == 'now')
+        sql = (f'INSERT INTO "{table}" ({", ".join(name for name, _ in columns)})'
+               f' VALUES ({", ".join("?" for _ in columns)})')
+
+        def values(row: tuple) -> tuple:
+            return tuple(
+                _round_half_up(value) if kind == 'int' and isinstance(value, float) else value
+                for value, kind in zip(row, kinds)
+            ) + now
+
+        self.connection.executemany(sql, map(values, rows))
+
+    def set_sequences(self, values: List[Tuple[str, int]]):
+        # INTEGER PRIMARY KEY already continues after the largest id
+        pass
+
+
+def _open_loader(url: str) -> _DatabaseLoader:
+    """Loader for a postgresql://... or sqlite:///path URL.
+
+    As in SQLAlchemy, the path after sqlite:/// is relative to the working
+    directory; an absolute path gives four slashes (sqlite:////tmp/cars.db).
+    """
+    scheme, _, rest = url.partition('://')
+    if scheme in ('postgres', 'postgresql'):
+        return PostgresLoader(url)
+    if scheme == 'sqlite':
+        return SqliteLoader(rest[1:] if rest.startswith('/') else rest)
+    raise ValueError(f"Unsupported database URL: {url}")
+
+
+class FilterIndex:
+    """Memory-mapped reader for files written by CarsXMLParser.write_filter_index()"""
+
+    def __init__(self, index_file: str):
+        mapped = _map_sections(index_file, FILTER_INDEX_MAGIC)
+        if mapped is None or mapped[0].get('version') != FILTER_INDEX_VERSION:
+            raise ValueError(f"Not a filter index (version {FILTER_INDEX_VERSION}): {index_file}")
+        self.header, self._sections = mapped
+        # Posting list bucket of every dimension id; ids may be sparse (see IdMap)
+        self._buckets = {dimension: {id_: bucket for bucket, (id_, _) in enumerate(values, 1)}
+                         for dimension, values in self.header['dimensions'].items()}
+
+    def in_range(self, field: str, low: int = None, high: int = None):
+        """Specification ids whose field lies in [low, high], ordered by that field"""
+        values = self._sections[f'{field}.values']
+        start = 0 if low is None else bisect.bisect_left(values, low)
+        stop = len(values) if high is None else bisect.bisect_right(values, high)
+        return self._sections[f'{field}.ids'][start:stop]
+
+    def with_value(self, dimension: str, value_id: int = None):
+        """Sorted Specification ids whose dimension id is value_id (None for NULL)"""
+        offsets = self._sections[f'{dimension}.offsets']
+        bucket = 0 if value_id is None else self._buckets[dimension].get(value_id)
+        if bucket is None:
+            return self._sections[f'{dimension}.ids'][0:0]
+        return self._sections[f'{dimension}.ids'][offsets[bucket]:offsets[bucket + 1]]
+
+    def search(self, ranges: Dict[str, Tuple] = None, dimensions: Dict[str, List] = None) -> List[int]:
+        """Sorted ids matching every (low, high) range and, per dimension, any of the value ids"""
+        candidates = [
+            set().union(*(self.with_value(dimension, value_id) for value_id in value_ids))
+            for dimension, value_ids in (dimensions or {}).items()
+        ]
+        candidates.extend(set(self.in_range(field, low, high)) for field, (low, high) in (ranges or {}).items())
+        if not candidates:
+            return sorted(self._sections[f'{next(iter(FILTER_RANGE_FIELDS))}.ids'])
+
+        # Intersect starting from the most selective filter
+        candidates.sort(key=len)
+        result = candidates[0]
+        for other in candidates[1:]:
+            result = result & other
+        return sorted(result)
+
+
+class CarsXMLParser:
+    def __init__(self, xml_file: str, brand_rules: BrandRules = None, id_map: IdMap = None):
+        self.xml_file = xml_file
+        self.brand_rules = brand_rules if brand_rules is not None else BrandRules.load()
+        self.id_map = id_map
+        self.brands = []
+        self.models = []
+        self.modifications = ModificationStore()
+        self.countries = DimensionRegistry('Country')
+        self.cities = DimensionRegistry('City', sort=False)
+        self.body_types = DimensionRegistry('BodyType')
+        self.fuel_types = DimensionRegistry('FuelType')
+        self.transmissions = DimensionRegistry('Transmission')
+        self.drive_types = DimensionRegistry('DriveType')
+        self.memo_stats = {
+            'modification_names': {'hits': 0, 'misses': 0},
+            'years': {'hits': 0, 'misses': 0},
+        }
+        self.stats = PipelineStats()
+        self.run_info = {}
+        self._input_digest = None
+        self._aggregate_rows = None
+
+        for city, _ in self._get_sample_cities():
+            self.cities.add(city)
+
+    def parse(self, stream: bool = False, jobs: int = 1, snapshot: str = None, feeds: List[str] = None):
+        """Parse XML file and extract all data
+
+        With stream=True the file is read with iterparse and every <mark>
+        subtree is released as soon as it has been processed, so the element
+        tree never has to fit in memory as a whole. This lowers the peak but
+        does not flatten it: the parsed rows are still all kept for the dump,
+        so memory keeps growing with the catalog.
+
+        With jobs > 1 the <mark> byte ranges found by a scan of the
+        memory-mapped file are handed to a process pool, each worker parses
+        its ranges itself, and the results are renumbered in document order,
+        so the ids match a serial run exactly. stream makes no difference
+        there, since no process ever holds more than its own <mark> subtrees.
+
+        snapshot names a parse snapshot file: when it matches this input and
+        parser version the XML is not read at all, otherwise it is rewritten
+        after parsing. Spec generation always runs.
+
+        feeds lists more catalog files to merge into this one; see
+        _parse_feeds for how they are parsed and deduplicated.
+
+        With an id_map, the running-counter ids are replaced by stable ones
+        before spec generation (see _apply_id_map).
+        """
+        memo_before = _memo_counters()
+        self.run_info.update(input=self.xml_file, stream=stream, jobs=jobs)
+        if feeds:
+            self.run_info['feeds'] = feeds
+
+        if feeds:
+            print(f"🔄 Parsing {len(feeds) + 1} feeds...")
+            self._parse_feeds([self.xml_file] + feeds, stream)
+        elif not (snapshot and self.load_snapshot(snapshot)):
+            print("🔄 Parsing cars.xml...")
+            self._parse_xml(stream, jobs)
+            if snapshot:
+                self.save_snapshot(snapshot)
+
+        self._add_memo_stats(_memo_delta(memo_before))
+        if self.id_map is not None:
+            with self.stats.phase('stable_ids'):
+                self._apply_id_map()
+        with self.stats.phase('spec_generation'):
+            self._generate_specs()
+
+        self.stats.count('brands', len(self.brands))
+        self.stats.count('models', len(self.models))
+        self.stats.count('modifications', len(self.modifications))
 
-    def _guess_country(self, brand_name: str) -> str:
-        """Guess country of origin based on brand name"""
-        # Russian brands
-        russian_brands = ['Lada', 'ГАЗ', 'УАЗ', 'Москвич', 'Marussia']
-        if brand_name in russian_brands:
-            return 'Россия'
-
-        # German brands
-        german_brands = ['Mercedes-Benz', 'BMW', 'Audi', 'Volkswagen', 'Porsche', 'Opel']
-        if brand_name in german_brands:
-            return 'Германия'
-
-        # Japanese brands
-        japanese_brands = ['Toyota', 'Honda', 'Nissan', 'Mazda', 'Subaru', 'Mitsubishi', 'Lexus', 'Suzuki', 'Isuzu']
-        if brand_name in japanese_brands:
-            return 'Япония'
-
-        # American brands
-        american_brands = ['Ford', 'Chevrolet', 'Dodge', 'Jeep', 'Tesla', 'Cadillac', 'Chrysler']
-        if brand_name in american_brands:
-            return 'США'
-
-        # Korean brands
-        korean_brands = ['Hyundai', 'Kia', 'Genesis', 'Daewoo']
-        if brand_name in korean_brands:
-            return 'Южная Корея'
-
-        # Chinese brands
-        chinese_brands = ['Chery', 'Geely', 'BYD', 'Great Wall', 'Haval', 'Changan']
-        if brand_name in chinese_brands:
-            return 'Китай'
-
-        # French brands
-        french_brands = ['Renault', 'Peugeot', 'Citroën', 'DS']
-        if brand_name in french_brands:
-            return 'Франция'
-
-        # Italian brands
-        italian_brands = ['Ferrari', 'Lamborghini', 'Maserati', 'Alfa Romeo', 'Fiat']
-        if brand_name in italian_brands:
-            return 'Италия'
-
-        # British brands
-        british_brands = ['Aston Martin', 'Bentley', 'Rolls-Royce', 'Jaguar', 'Land Rover', 'McLaren']
-        if brand_name in british_brands:
-            return 'Великобритания'
-
-        # Swedish brands
-        swedish_brands = ['Volvo', 'Saab', 'Koenigsegg', 'Polestar']
-        if brand_name in swedish_brands:
-            return 'Швеция'
-
-        # Default
-        return 'Другое'
-
-    def _generate_specs(self, brand_name: str, engine_info: Dict, body_type: str, year: int) -> Dict:
-        """Generate realistic specs based on brand, engine, body type"""
-        power = engine_info['power']
-        volume = engine_info['volume']
-
-        # Price estimation based on brand prestige and power
-        luxury_brands = ['Ferrari', 'Lamborghini', 'Rolls-Royce', 'Bentley', 'Aston Martin',
-                        'Maserati', 'Porsche', 'McLaren', 'Koenigsegg', 'Bugatti']
-        premium_brands = ['Mercedes-Benz', 'BMW', 'Audi', 'Lexus', 'Cadillac', 'Genesis', 'Volvo']
-
-        base_price = 1500000  # Default base price in rubles
-
-        if brand_name in luxury_brands:
-            base_price = 15000000
-        elif brand_name in premium_brands:
-            base_price = 4000000
-
-        # Adjust by power
-        price_multiplier = 1 + (power / 300)
-        price_min = int(base_price * price_multiplier)
-        price_max = int(price_min * 1.5)
-
-        # Fuel consumption (realistic range)
-        if engine_info['fuel_type'] == 'Электро':
-            fuel_consumption = round(15 + (power / 50), 1)  # kWh/100km
-        elif engine_info['fuel_type'] == 'Гибрид':
-            fuel_consumption = round(4 + (volume * 1.5), 1)
-        elif engine_info['fuel_type'] == 'Дизель':
-            fuel_consumption = round(5 + (volume * 1.2), 1)
-        else:  # Бензин
-            fuel_consumption = round(7 + (volume * 2), 1)
-
-        # Acceleration (0-100 km/h)
-        if power > 500:
-            acceleration = round(2.5 + (1000 / power), 1)
+        print(f"✅ Parsed: {len(self.brands)} brands, {len(self.models)} models, {len(self.modifications)} modifications")
+        if self.stats.counters.get('nested_folders'):
+            print(f"⚠️  {self.stats.counters['nested_folders']} nested folders: "
+                  f"{self.stats.counters['double_counted_modifications']} extra modification rows "
+                  f"were produced by the old nested findall() traversal")
+
+    def _parse_xml(self, stream: bool, jobs: int):
+        if jobs > 1:
+            self._parse_parallel(stream, jobs)
         else:
-            acceleration = round(3 + (600 / power), 1)
+            brand_id_counter = 1
+            model_id_counter = 1
+            modification_id_counter = 1
 
-        # Max speed
-        if power > 500:
-            max_speed = int(250 + (power / 5))
+            for mark in self._iter_marks(stream):
+                model_id_counter, modification_id_counter = self._parse_mark(
+                    mark, brand_id_counter, model_id_counter, modification_id_counter
+                )
+                brand_id_counter += 1
+
+    def _parse_parallel(self, stream: bool, jobs: int):
+        """Parse <mark> byte ranges in worker processes and merge them in order
+
+        The parent only scans the file for <mark> boundaries and merges
+        results; reading, parsing and traversing the subtrees all happen in
+        the workers.
+        """
+        with self.stats.phase('mark_scan'):
+            with open(self.xml_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                spans = _scan_marks(data)
+            tasks = [(self.xml_file, chunk) for chunk in _span_chunks(spans, TASK_BYTES)]
+
+        with multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(self.brand_rules,)) as pool:
+            for brands, models, modifications, dimensions, memo, stats in pool.imap(_parse_mark_spans, tasks):
+                token = self.stats.begin()
+                # Workers number every chunk from 1; shift onto the global counters
+                brand_offset = len(self.brands)
+                model_offset = len(self.models)
+                modification_offset = len(self.modifications)
+
+                for brand in brands:
+                    brand['id'] += brand_offset
+                    self.countries.add(brand['country'])
+                for model in models:
+                    model['id'] += model_offset
+                    model['brand_id'] += brand_offset
+
+                self.brands.extend(brands)
+                self.models.extend(models)
+                self.modifications.extend(modifications, modification_offset, model_offset, brand_offset)
+
+                for registry, values in zip(self._row_dimensions(), dimensions):
+                    for value in values:
+                        registry.add(value)
+                self._add_memo_stats(memo)
+                self.stats.merge(stats)
+                self.stats.end('chunk_merge', token)
+
+    def _parse_feeds(self, xml_files: List[str], stream: bool):
+        """Parse every feed in its own process and merge them in the given order
+
+        The feeds are parsed at the same time, so the wall time is that of
+        the largest one plus the merge. Conflict rule: the first feed to
+        define a key wins. Brands are matched by name. A folder whose
+        generation_id an earlier feed already had is dropped, and its
+        modifications join the earlier model and are priced by its brand. A modification
+        whose external_id an earlier feed already had is dropped. Keys that
+        repeat within one feed, brand names included, are kept, as in a
+        single-file run.
+        """
+        brand_ids: Dict[str, int] = {}
+        model_ids: Dict[str, int] = {}
+        model_brands: Dict[int, int] = {}
+        external_ids: Set[str] = set()
+
+        with multiprocessing.Pool(len(xml_files), initializer=_init_worker,
+                                  initargs=(self.brand_rules,)) as pool:
+            tasks = [(xml_file, stream) for xml_file in xml_files]
+            for brands, models, modifications, dimensions, memo, stats in pool.imap(_parse_feed, tasks):
+                token = self.stats.begin()
+
+                # Only earlier feeds are checked: this feed's keys are added afterwards
+                brand_map = {}
+                feed_brand_ids: Dict[str, int] = {}
+                for brand in brands:
+                    if brand['name'] in brand_ids:
+                        brand_map[brand['id']] = brand_ids[brand['name']]
+                        continue
+                    brand_id = len(self.brands) + 1
+                    # A later feed's brand joins the first of the repeated marks
+                    feed_brand_ids.setdefault(brand['name'], brand_id)
+                    self.brands.append(dict(brand, id=brand_id))
+                    self.countries.add(brand['country'])
+                    brand_map[brand['id']] = brand_id
+                brand_ids.update(feed_brand_ids)
+
+                # Folders and modifications without an id never count as duplicates
+                model_map = {}
+                feed_model_ids: Dict[str, int] = {}
+                for model in models:
+                    key = model['generation_id']
+                    if key is not None and key in model_ids:
+                        self.stats.count('duplicate_models')
+                        model_map[model['id']] = model_ids[key]
+                        continue
+                    model_id = len(self.models) + 1
+                    if key is not None:
+                        # A later feed's duplicate joins the first of the repeated folders
+                        feed_model_ids.setdefault(key, model_id)
+                    model_brands[model_id] = brand_map[model['brand_id']]
+                    self.models.append(dict(model, id=model_id, brand_id=model_brands[model_id]))
+                    model_map[model['id']] = model_id
+                model_ids.update(feed_model_ids)
+
+                rows = [i for i, external_id in enumerate(modifications.external_ids)
+                        if external_id is None or external_id not in external_ids]
+                self.stats.count('duplicate_modifications', len(modifications) - len(rows))
+                external_ids.update(modifications.external_ids)
+                first_row = len(self.modifications)
+                self.modifications.extend_rows(modifications, rows, model_map, model_brands)
+
+                # Rows that joined another brand's model are priced by that brand
+                columns = self.modifications.columns
+                for i in range(first_row, len(self.modifications)):
+                    columns['tier'][i] = self._brand_tier(self.brands[columns['brand_id'][i] - 1]['name'])
+
+                for registry, values in zip(self._row_dimensions(), dimensions):
+                    for value in values:
+                        registry.add(value)
+                self._add_memo_stats(memo)
+                self.stats.merge(stats)
+                self.stats.end('feed_merge', token)
+
+        counters = self.stats.counters
+        print(f"🔀 Merged feeds: dropped {counters.get('duplicate_models', 0)} duplicate models, "
+              f"{counters.get('duplicate_modifications', 0)} duplicate modifications")
+
+    def _apply_id_map(self):
+        """Renumber brands, models and specifications by brand code, generation id and external id"""
+        brand_ids = dict(zip(
+            [brand['id'] for brand in self.brands],
+            self.id_map.assign('Brand', _unique_keys(brand['code'] for brand in self.brands))
+        ))
+        model_ids = dict(zip(
+            [model['id'] for model in self.models],
+            self.id_map.assign('Model', _unique_keys(model['generation_id'] for model in self.models))
+        ))
+        for brand in self.brands:
+            brand['id'] = brand_ids[brand['id']]
+        for model in self.models:
+            model['id'] = model_ids[model['id']]
+            model['brand_id'] = brand_ids[model['brand_id']]
+
+        # New arrays rather than in-place updates: snapshot columns are read-only views
+        store = self.modifications
+        store.columns['id'] = array('q', self.id_map.assign('Specification', _unique_keys(store.external_ids)))
+        store.columns['model_id'] = array('q', [model_ids[id_] for id_ in store.columns['model_id']])
+        store.columns['brand_id'] = array('q', [brand_ids[id_] for id_ in store.columns['brand_id']])
+
+        self.stats.count('stable_ids_new', self.id_map.new_keys)
+        self.stats.count('stable_id_collisions', self.id_map.collisions)
+
+    def _add_memo_stats(self, delta: Dict[str, Tuple[int, int]]):
+        for name, (hits, misses) in delta.items():
+            self.memo_stats[name]['hits'] += hits
+            self.memo_stats[name]['misses'] += misses
+
+    def _row_dimensions(self) -> Tuple[DimensionRegistry, ...]:
+        """Registries filled from modification rows while parsing"""
+        return self.body_types, self.fuel_types, self.transmissions, self.drive_types
+
+    def _iter_marks(self, stream: bool):
+        """Yield <mark> elements in document order"""
+        if not stream:
+            with self.stats.phase('xml_load'):
+                tree = ET.parse(self.xml_file)
+                root = tree.getroot()
+                marks = root.findall('.//mark')
+            yield from marks
+            return
+
+        # Keep the chain of open elements so a finished <mark> can be detached
+        # from its parent; otherwise the root would keep every subtree alive.
+        path = []
+        token = self.stats.begin()
+        for event, elem in ET.iterparse(self.xml_file, events=('start', 'end')):
+            if event == 'start':
+                path.append(elem)
+                continue
+
+            path.pop()
+            if elem.tag == 'mark':
+                self.stats.end('xml_load', token)
+                yield elem
+                elem.clear()
+                if path:
+                    path[-1].remove(elem)
+                token = self.stats.begin()
+        self.stats.end('xml_load', token)
+
+    def _parse_mark(self, mark, brand_id_counter: int, model_id_counter: int,
+                    modification_id_counter: int) -> Tuple[int, int]:
+        """Extract one brand with its models and modifications.
+
+        Returns the next free model and modification ids.
+        """
+        token = self.stats.begin()
+        brand_name = mark.get('name')
+        brand_fields = [_UNSET]
+        models = []
+        # Raw modification attributes; their names are parsed in one go below
+        pending = []
+        nested_folders = 0
+        double_counted = 0
+
+        # One depth-first pass over the subtree, visiting every element once
+        # in document order. The explicit stack holds an iterator over the
+        # children still to visit at each level, with the parent's tag and
+        # record, the innermost enclosing folder's model and the folder
+        # depth; a modification belongs to its innermost folder only. Leaf
+        # fields take the first matching direct child, like find() did.
+        stack = [(iter(mark), 'mark', brand_fields, None, 0)]
+        while stack:
+            children, parent_tag, parent, folder, depth = stack[-1]
+            for element in children:
+                tag = element.tag
+
+                if tag == 'modification':
+                    # The hot path: two leaf fields read inline, nothing pushed
+                    body_type = years = _UNSET
+                    branches = []
+                    for child in element:
+                        child_tag = child.tag
+                        if child_tag == 'body_type':
+                            if body_type is _UNSET:
+                                body_type = child.text
+                        elif child_tag == 'years':
+                            if years is _UNSET:
+                                years = child.text
+                        if len(child) or child_tag in _BRANCH_TAGS:
+                            branches.append(child)
+                    if folder is not None:
+                        if body_type is _UNSET:
+                            body_type = 'Седан'
+                        if years is _UNSET:
+                            years = '2020 - 2024'
+                        self.body_types.add(body_type)
+                        pending.append((folder['id'], element.get('name'), element.get('id'), body_type, years))
+                        # The old nested findall('.//modification') counted it once per enclosing folder
+                        double_counted += depth - 1
+                    if branches:
+                        stack.append((iter(branches), tag, None, folder, depth))
+                        break
+
+                elif tag == 'folder':
+                    model = {
+                        'id': model_id_counter,
+                        'brand_id': brand_id_counter,
+                        'name': element.get('name'),
+                        'code': _UNSET,
+                        'generation_id': element.get('id')
+                    }
+                    models.append(model)
+                    model_id_counter += 1
+                    if folder is not None:
+                        nested_folders += 1
+                    stack.append((iter(element), tag, model, model, depth + 1))
+                    break
+
+                else:
+                    if parent_tag == 'folder':
+                        if tag == 'model' and parent['code'] is _UNSET:
+                            parent['code'] = element.text
+                    elif parent_tag == 'mark':
+                        if tag == 'code' and parent[0] is _UNSET:
+                            parent[0] = element.text
+                    if len(element):
+                        stack.append((iter(element), tag, None, folder, depth))
+                        break
+            else:
+                stack.pop()
+
+        # Add brand
+        brand_code_text = brand_fields[0]
+        if brand_code_text is _UNSET:
+            brand_code_text = brand_name.upper()
+        country, tier, _ = self.brand_rules.classify(brand_name)
+        self.brands.append({
+            'id': brand_id_counter,
+            'name': brand_name,
+            'code': brand_code_text,
+            'country': country
+        })
+        self.countries.add(country)
+
+        for model in models:
+            if model['code'] is _UNSET:
+                model['code'] = model['name']
+        self.models.extend(models)
+
+        if nested_folders:
+            self.stats.count('nested_folders', nested_folders)
+            self.stats.count('double_counted_modifications', double_counted)
+
+        token = self.stats.end('traversal', token)
+
+        for model_id, mod_name, mod_id, body_type, years in pending:
+            # Extract technical specs from modification name
+            engine_info = self._parse_modification_name(mod_name)
+
+            self.fuel_types.add(engine_info['fuel_type'])
+            self.transmissions.add(engine_info['transmission'])
+            if engine_info['drive_type']:
+                self.drive_types.add(engine_info['drive_type'])
+
+            # Parse years
+            year_from, year_to = self._parse_years(years)
+
+            # Prices and specs are generated for all rows at once after parsing
+            self.modifications.append(
+                modification_id_counter, model_id, brand_id_counter, mod_name, mod_id,
+                body_type, engine_info, year_from, year_to, tier
+            )
+            modification_id_counter += 1
+
+        self.stats.end('name_parsing', token)
+
+        return model_id_counter, modification_id_counter
+
+    def _parse_modification_name(self, mod_name: str) -> Dict:
+        """Extract engine specs from modification name like '2.8d MT (177 л.с.) 4WD'"""
+        volume, power, fuel_type, transmission, drive_type = _tokenize_modification_name(mod_name)
+        return {
+            'volume': volume,
+            'power': power,
+            'fuel_type': fuel_type,
+            'transmission': transmission,
+            'drive_type': drive_type
+        }
+
+    def _parse_years(self, years_str: str) -> Tuple[int, int]:
+        """Parse year range like '2010 - 2014' or '2024 - по н.в.'"""
+        return _split_years(years_str, datetime.now().year)
+
+    def _brand_tier(self, brand_name: str) -> int:
+        """Price tier of a brand: luxury, premium or standard"""
+        return self.brand_rules.classify(brand_name)[1]
+
+    def _generate_specs(self):
+        """Generate realistic specs based on brand, engine, body type
+
+        Fills the spec columns of self.modifications in one pass over the
+        columns, vectorized with NumPy when it is installed.
+        """
+        store = self.modifications
+        self._aggregate_rows = None
+        if not len(store):
+            return
+
+        fuel_types = store.categories['fuel_type']
+        if np is not None:
+            specs = self._generate_specs_numpy(store, fuel_types)
         else:
-            max_speed = int(180 + (power / 3))
+            specs = self._generate_specs_python(store, fuel_types)
+
+        for name, values in specs.items():
+            column = store.columns[name]
+            del column[:]
+            column.extend(values)
+
+    def _generate_specs_python(self, store: ModificationStore, fuel_types: List[str]) -> Dict:
+        columns = store.columns
+        power = columns['horsepower']
+        volume = columns['engine_volume']
+        tier = columns['tier']
+
+        # Price estimation based on brand prestige and power (rubles)
+        base_prices = {TIER_LUXURY: 15000000, TIER_PREMIUM: 4000000, TIER_STANDARD: 1500000}
+        price_min = [int(base_prices[t] * (1 + (p / 300))) for t, p in zip(tier, power)]
+        price_max = [int(price * 1.5) for price in price_min]
+
+        # Fuel consumption (realistic range); electric cars use kWh/100km
+        def consumption(fuel_type: str, p: int, v: float) -> float:
+            if fuel_type == 'Электро':
+                return round(15 + (p / 50), 1)
+            if fuel_type == 'Гибрид':
+                return round(4 + (v * 1.5), 1)
+            if fuel_type == 'Дизель':
+                return round(5 + (v * 1.2), 1)
+            return round(7 + (v * 2), 1)
+
+        fuel_consumption = [
+            consumption(fuel_types[code], p, v)
+            for code, p, v in zip(columns['fuel_type'], power, volume)
+        ]
+
+        # Acceleration (0-100 km/h) and max speed
+        acceleration = [round(2.5 + (1000 / p), 1) if p > 500 else round(3 + (600 / p), 1) for p in power]
+        max_speed = [int(250 + (p / 5)) if p > 500 else int(180 + (p / 3)) for p in power]
 
         # Maintenance cost (yearly, in rubles)
-        maintenance_cost = int(100000 + (power * 200) + (volume * 15000))
-        if brand_name in luxury_brands:
-            maintenance_cost *= 3
-        elif brand_name in premium_brands:
-            maintenance_cost *= 1.8
+        maintenance_factors = {TIER_LUXURY: 3, TIER_PREMIUM: 1.8, TIER_STANDARD: 1}
+        maintenance_cost = [
+            int(100000 + (p * 200) + (v * 15000)) * maintenance_factors[t]
+            for p, v, t in zip(power, volume, tier)
+        ]
 
         return {
             'price_min': price_min,
             'price_max': price_max,
             'fuel_consumption': fuel_consumption,
-            'acceleration': acceleration,
+            'acceleration_0_100': acceleration,
             'max_speed': max_speed,
-            'maintenance_cost': maintenance_cost
+            'maintenance_cost_per_year': maintenance_cost
         }
 
-    def generate_sql_dump(self, output_file: str):
-        """Generate SQL dump file"""
+    def _generate_specs_numpy(self, store: ModificationStore, fuel_types: List[str]) -> Dict:
+        columns = store.columns
+        power = np.frombuffer(columns['horsepower'], dtype=np.int64).astype(np.float64)
+        volume = np.frombuffer(columns['engine_volume'], dtype=np.float64)
+        tier = np.frombuffer(columns['tier'], dtype=np.int8)
+        fuel = np.array(fuel_types, dtype=object)[np.frombuffer(columns['fuel_type'], dtype=np.uint16)]
+
+        # Price estimation based on brand prestige and power (rubles)
+        base_price = np.select([tier == TIER_LUXURY, tier == TIER_PREMIUM], [15000000.0, 4000000.0], 1500000.0)
+        price_min = np.trunc(base_price * (1 + (power / 300)))
+        price_max = np.trunc(price_min * 1.5)
+
+        # Fuel consumption (realistic range); electric cars use kWh/100km
+        fuel_consumption = _round1(np.select(
+            [fuel == 'Электро', fuel == 'Гибрид', fuel == 'Дизель'],
+            [15 + (power / 50), 4 + (volume * 1.5), 5 + (volume * 1.2)],
+            7 + (volume * 2)
+        ))
+
+        # Acceleration (0-100 km/h) and max speed
+        fast = power > 500
+        acceleration = _round1(np.where(fast, 2.5 + (1000 / power), 3 + (600 / power)))
+        max_speed = np.trunc(np.where(fast, 250 + (power / 5), 180 + (power / 3)))
+
+        # Maintenance cost (yearly, in rubles)
+        maintenance_cost = np.trunc(100000 + (power * 200) + (volume * 15000))
+        maintenance_cost = maintenance_cost * np.select([tier == TIER_LUXURY, tier == TIER_PREMIUM], [3, 1.8], 1)
+
+        return {
+            'price_min': price_min.astype(np.int64).tolist(),
+            'price_max': price_max.astype(np.int64).tolist(),
+            'fuel_consumption': fuel_consumption.tolist(),
+            'acceleration_0_100': acceleration.tolist(),
+            'max_speed': max_speed.astype(np.int64).tolist(),
+            'maintenance_cost_per_year': maintenance_cost.tolist()
+        }
+
+    def generate_sql_dump(self, output_file: str, fmt: str = 'insert'):
+        """Generate SQL dump file
+
+        fmt selects the row format: 'insert' (multi-row INSERT statements)
+        or 'copy' (COPY ... FROM stdin, much faster for psql to load).
+        """
         print(f"📝 Generating SQL dump: {output_file}")
 
-        with open(output_file, 'w', encoding='utf-8') as f:
-            # Header
-            f.write("-- Cars Database Dump\n")
+        with self._open_output(output_file) as f:
+            f.write(self._dump_header())
+
+            writer = DUMP_WRITERS[fmt](f)
+            for comment, table, rows, batched in self._dump_tables():
+                f.write(f"-- {comment}\n")
+                writer.write_table(table, rows, batched)
+                self.stats.count(f"dump_rows_{table}", len(rows))
+
+            f.write(self._sequences_sql())
+            f.write("COMMIT;\n")
+
+        print(f"✅ SQL dump generated successfully!")
+
+    def generate_split_dump(self, output_dir: str, fmt: str = 'copy', parts: int = 1,
+                            compression: str = 'gzip') -> Dict:
+        """Write one file per table into output_dir, plus a manifest.json
+
+        Specification is sorted by id and split into `parts` files with
+        disjoint id ranges. Every file loads on its own in a separate
+        session; the manifest lists the files with their load stage (all
+        files of a stage only depend on earlier stages and can be restored
+        concurrently), row counts and sha256 checksums. Returns the manifest.
+        """
+        print(f"📝 Generating split SQL dump: {output_dir}")
+        os.makedirs(output_dir, exist_ok=True)
+        suffix = COMPRESSION_SUFFIXES[compression]
+        files = []
+
+        def write_file(name: str, table: str, rows, batched: bool, title: str, stage: int, **extra):
+            path = os.path.join(output_dir, name + '.sql' + suffix)
+            with _open_compressed(path, compression) as f:
+                f.write(f"-- Cars Database Dump: {title}\n")
+                f.write("SET client_encoding = 'UTF8';\n")
+                f.write("SET standard_conforming_strings = on;\n\n")
+                if table:
+                    DUMP_WRITERS[fmt](f).write_table(table, rows, batched)
+                    self.stats.count(f"dump_rows_{table}", len(rows))
+                else:
+                    f.write(rows)
+            files.append(dict(file=os.path.basename(path), table=table, stage=stage,
+                              rows=len(rows) if table else 0, bytes=os.path.getsize(path),
+                              sha256=file_digest(path, 'sha256'), **extra))
+
+        with self.stats.phase('formatting'):
+            for position, (comment, table, rows, batched) in enumerate(self._dump_tables()):
+                stage = _load_stage(table)
+                if table != 'Specification':
+                    write_file(f"{position:02d}-{table}", table, rows, batched, comment, stage)
+                    continue
+
+                # Stable ids (--id-map) do not follow document order
+                rows = sorted(rows, key=lambda row: row[0])
+                step = -(-len(rows) // max(1, parts)) or 1
+                for part, start in enumerate(range(0, len(rows), step), 1):
+                    chunk = rows[start:start + step]
+                    write_file(f"{position:02d}-{table}-{part:03d}", table, chunk, batched,
+                               f"{comment} {part}", stage, id_range=[chunk[0][0], chunk[-1][0]])
+
+            last_stage = max(entry['stage'] for entry in files)
+            write_file("99-sequences", None, self._sequences_sql(), False, "Sequences", last_stage + 1)
+
+        manifest = {
+            'version': SPLIT_MANIFEST_VERSION,
+            'generated': datetime.now().isoformat(timespec='seconds'),
+            'format': fmt,
+            'compression': compression,
+            'dependencies': {table: list(TABLE_DEPENDENCIES.get(table, ())) for table in TABLE_COLUMNS},
+            'files': sorted(files, key=lambda entry: (entry['stage'], entry['file'])),
+        }
+        with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        total = sum(entry['bytes'] for entry in files)
+        print(f"✅ Split dump generated: {len(files)} files, {total / (1024 * 1024):.1f} MB")
+        return manifest
+
+    def load_into_database(self, url: str):
+        """Replace the catalog tables of a database with this run's rows
+
+        Streams the same rows as generate_sql_dump() over a single connection
+        and transaction, without an intermediate SQL file. The secondary
+        Specification indexes are dropped for the bulk load and rebuilt once
+        at the end, which is cheaper than maintaining them row by row.
+        """
+        print(f"🚚 Loading into database: {re.sub(r'//[^/@]*@', '//', url)}")
+
+        with _open_loader(url) as loader:
+            with self.stats.phase('db_reset'):
+                loader.reset(list(reversed(TABLE_COLUMNS)))
+                indexes = loader.drop_indexes('Specification')
+
+            for _, table, rows, batched in self._dump_tables():
+                with self.stats.phase('db_load'):
+                    loader.write_table(table, rows, batched)
+                self.stats.count(f"db_rows_{table}", len(rows))
+
+            with self.stats.phase('index_rebuild'):
+                loader.create_indexes(indexes)
+                loader.set_sequences(self._sequence_values())
+
+        print(f"✅ Database loaded successfully!")
+
+    def _dump_header(self) -> str:
+        return (
+            "-- Cars Database Dump\n"
+            f"-- Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+            f"-- Brands: {len(self.brands)}\n"
+            f"-- Models: {len(self.models)}\n"
+            f"-- Modifications: {len(self.modifications)}\n"
+            "\n"
+            "SET client_encoding = 'UTF8';\n"
+            "SET standard_conforming_strings = on;\n"
+            "\n"
+            "BEGIN;\n\n"
+        )
+
+    def _sequences_sql(self) -> str:
+        """setval() calls that move every id sequence past the written rows"""
+        lines = ["-- Update sequences\n"]
+        for table, last_id in self._sequence_values():
+            lines.append(f"SELECT setval('\"{table}_id_seq\"', {last_id}, true);\n")
+        lines.append("\n")
+        return ''.join(lines)
+
+    def _sequence_values(self) -> List[Tuple[str, int]]:
+        """(table, last id) for every table with an id sequence"""
+        values = [registry.sequence_value()
+                  for registry in (self.countries, self.cities, self.body_types,
+                                   self.fuel_types, self.transmissions, self.drive_types)]
+        # Stable ids (see IdMap) are hashed over the whole 1..STABLE_ID_SPACE
+        # range, so rows inserted through the sequence must start above it
+        floor = STABLE_ID_SPACE if self.id_map is not None else 0
+        last_ids = {
+            'Brand': max((brand['id'] for brand in self.brands), default=0),
+            'Model': max((model['id'] for model in self.models), default=0),
+            'Specification': max(self.modifications.columns['id'], default=0),
+        }
+        values.extend((table, max(last_id, floor)) for table, last_id in last_ids.items())
+        # A delta keeps facet ids per natural key, so they can be sparse too
+        values.append(('SpecificationFacet', max((row[0] for row in self._aggregates()[1]), default=0)))
+        return values
+
+    @contextmanager
+    def _open_output(self, output_file: str):
+        """Open an output file whose writes are booked as file_writes.
+
+        Everything else spent inside the block (building rows, formatting
+        values) is booked as formatting.
+        """
+        writes_before = self.stats.totals('file_writes')
+        token = self.stats.begin()
+        f = open(output_file, 'w', encoding='utf-8')
+        try:
+            yield _TimedFile(f, self.stats)
+        finally:
+            # Closing flushes the buffered tail of the file
+            close_token = self.stats.begin()
+            f.close()
+            self.stats.end('file_writes', close_token)
+
+        writes_after = self.stats.totals('file_writes')
+        self.stats.end('formatting', token, minus=(writes_after[0] - writes_before[0],
+                                                   writes_after[1] - writes_before[1]))
+
+    def write_report(self, report_file: str, allocations: List[Dict] = None):
+        """Save a JSON report with per-phase timings, counters and memo hit rates"""
+        report = dict(self.run_info, generated=datetime.now().isoformat(timespec='seconds'))
+        report.update(self.stats.report())
+        report['caches'] = {
+            name: dict(stats, hit_rate=round(stats['hits'] / max(1, stats['hits'] + stats['misses']), 4))
+            for name, stats in self.memo_stats.items()
+        }
+        if allocations is not None:
+            report['allocations'] = allocations
+
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📈 Report saved: {report_file}")
+
+    def _dump_tables(self):
+        """Yield (comment, table, rows, batched) for every table in load order"""
+        yield from self._reference_tables()
+
+        yield 'Brands', 'Brand', [self._brand_row(brand) for brand in self.brands], False
+
+        # Models (in batches to avoid huge INSERT)
+        yield 'Models', 'Model', [self._model_row(model) for model in self.models], True
+
+        # Specifications (in batches)
+        yield 'Specifications', 'Specification', self._specification_rows(), True
+
+        yield from self._aggregate_tables()
+
+    def _reference_tables(self):
+        """Yield the lookup tables, whose ids are only final after parsing"""
+        # Countries
+        yield 'Countries', 'Country', [
+            (i, country, self._country_code(country)) for i, country in self.countries.items()
+        ], False
+
+        # Cities (sample data)
+        yield 'Cities', 'City', [
+            (self.cities.id_of(city), city, self.countries.id_of(country))
+            for city, country in self._get_sample_cities()
+        ], False
+
+        yield 'Body Types', 'BodyType', self.body_types.items(), False
+        yield 'Fuel Types', 'FuelType', self.fuel_types.items(), False
+        yield 'Transmissions', 'Transmission', self.transmissions.items(), False
+        yield 'Drive Types', 'DriveType', self.drive_types.items(), False
+
+    def _aggregate_tables(self):
+        """Yield the precomputed search aggregates"""
+        model_stats, facets = self._aggregates()
+        yield 'Model Stats', 'ModelStats', model_stats, True
+        yield 'Specification Facets', 'SpecificationFacet', facets, True
+
+    def _aggregates(self) -> Tuple[List[tuple], List[tuple]]:
+        """ModelStats and SpecificationFacet rows, built once in one pass over the columns"""
+        if self._aggregate_rows is not None:
+            return self._aggregate_rows
+
+        columns = self.modifications.columns
+        categories = self.modifications.categories
+        body_type_ids, fuel_type_ids, transmission_ids = (
+            [registry.id_of(value) for value in categories[name]]
+            for name, registry in (('body_type', self.body_types), ('fuel_type', self.fuel_types),
+                                   ('transmission', self.transmissions))
+        )
+
+        # [brand, count, price min, price max, year from, year to, hp min, hp max] per model
+        models: Dict[int, List[int]] = {}
+        # [count, price min, price max] per (brand, body type, fuel type, transmission)
+        facets: Dict[Tuple[int, int, int, int], List[int]] = {}
+
+        for model_id, brand_id, body_type, fuel_type, transmission, price_min, price_max, \
+                year_from, year_to, power in zip(
+                    columns['model_id'], columns['brand_id'], columns['body_type'], columns['fuel_type'],
+                    columns['transmission'], columns['price_min'], columns['price_max'],
+                    columns['year_from'], columns['year_to'], columns['horsepower']):
+            stats = models.get(model_id)
+            if stats is None:
+                models[model_id] = [brand_id, 1, price_min, price_max, year_from, year_to, power, power]
+            else:
+                stats[1] += 1
+                stats[2] = min(stats[2], price_min)
+                stats[3] = max(stats[3], price_max)
+                stats[4] = min(stats[4], year_from)
+                stats[5] = max(stats[5], year_to)
+                stats[6] = min(stats[6], power)
+                stats[7] = max(stats[7], power)
+
+            key = (brand_id, body_type_ids[body_type], fuel_type_ids[fuel_type], transmission_ids[transmission])
+            facet = facets.get(key)
+            if facet is None:
+                facets[key] = [1, price_min, price_max]
+            else:
+                facet[0] += 1
+                facet[1] = min(facet[1], price_min)
+                facet[2] = max(facet[2], price_max)
+
+        self._aggregate_rows = (
+            [(model_id, *stats) for model_id, stats in sorted(models.items())],
+            [(i, *key, *facet) for i, (key, facet) in enumerate(sorted(facets.items()), 1)],
+        )
+        return self._aggregate_rows
+
+    def _brand_row(self, brand: Dict) -> tuple:
+        return (brand['id'], brand['name'], brand['code'], brand['country'],
+                _brand_logo_url(brand['code']),
+                self._is_popular_brand(brand['name']))
+
+    def _model_row(self, model: Dict) -> tuple:
+        return (model['id'], model['name'], str(model['code']), model['brand_id'],
+                str(model['generation_id']),
+                _model_image_url(model['code']))
+
+    def _specification_rows(self) -> List[tuple]:
+        """Build Specification rows straight from the modification columns"""
+        store = self.modifications
+        columns = store.columns
+
+        def dimension_ids(name: str, registry: DimensionRegistry) -> List:
+            # Map each category code to its table id once, then index per row
+            ids = [registry.id_of(value) if value else None for value in store.categories[name]]
+            return [ids[code] for code in columns[name]]
+
+        # Premium maintenance costs come from a float factor and keep their float form
+        maintenance_cost = [
+            cost if tier == TIER_PREMIUM else int(cost)
+            for cost, tier in zip(columns['maintenance_cost_per_year'], columns['tier'])
+        ]
+
+        return list(zip(
+            columns['id'], columns['model_id'], columns['brand_id'], store.names,
+            map(str, store.external_ids),
+            dimension_ids('body_type', self.body_types), columns['engine_volume'], columns['horsepower'],
+            dimension_ids('fuel_type', self.fuel_types), dimension_ids('transmission', self.transmissions),
+            dimension_ids('drive_type', self.drive_types),
+            columns['year_from'], columns['year_to'], columns['price_min'], columns['price_max'],
+            columns['fuel_consumption'], columns['acceleration_0_100'], columns['max_speed'],
+            maintenance_cost
+        ))
+
+    def write_filter_index(self, index_file: str):
+        """Write a memory-mappable filter index over the Specification rows
+
+        It is built from the same rows as the dump, so ids and values match
+        what was loaded. Each range field (prices, horsepower, years) is
+        stored as its values in sorted order next to the Specification ids
+        in that order, so a range filter is two binary searches and a
+        slice. Each dimension (brand, body type, fuel, transmission, drive)
+        gets posting lists in CSR form: ids[offsets[v]:offsets[v + 1]] are
+        the sorted ids of the rows with the v-th value of the header's list,
+        NULL being v = 0. Read it with FilterIndex.
+        """
+        with self.stats.phase('filter_index'):
+            # In id order, so that every posting list comes out sorted
+            rows = sorted(self._specification_rows())
+            sections = {}
+
+            for field, position in FILTER_RANGE_FIELDS.items():
+                ordered = sorted(rows, key=lambda row: row[position])
+                sections[f'{field}.values'] = array('q', [row[position] for row in ordered])
+                sections[f'{field}.ids'] = array('I', [row[0] for row in ordered])
+
+            dimension_values = {
+                'brand': [(brand['id'], brand['name']) for brand in self.brands],
+                'bodyType': self.body_types.items(),
+                'fuelType': self.fuel_types.items(),
+                'transmission': self.transmissions.items(),
+                'driveType': self.drive_types.items(),
+            }
+            for dimension, position in FILTER_DIMENSIONS.items():
+                # Counting sort by bucket: 0 for NULL, then one per value in header order
+                buckets = {id_: bucket for bucket, (id_, _) in enumerate(dimension_values[dimension], 1)}
+                buckets[None] = 0
+                counts = [0] * (len(buckets) + 1)
+                for row in rows:
+                    counts[buckets[row[position]] + 1] += 1
+                offsets = array('I', itertools.accumulate(counts))
+                postings = array('I', bytes(4 * len(rows)))
+                fill = list(offsets)
+                for row in rows:
+                    bucket = buckets[row[position]]
+                    postings[fill[bucket]] = row[0]
+                    fill[bucket] += 1
+                sections[f'{dimension}.offsets'] = offsets
+                sections[f'{dimension}.ids'] = postings
+
+            _write_sections(index_file, FILTER_INDEX_MAGIC, {
+                'version': FILTER_INDEX_VERSION,
+                'rows': len(rows),
+                'ranges': list(FILTER_RANGE_FIELDS),
+                # [id, name] per posting list bucket; ids are the dump's foreign keys
+                'dimensions': dimension_values,
+            }, sections)
+
+        print(f"🔎 Filter index saved: {index_file}")
+
+    def write_mark_index(self, index_file: str):
+        """Save the byte range of every <mark> and the ids its rows were given
+
+        generate_brand_patch() uses it to re-parse single brands without
+        reading the rest of the XML. The ranges come from a byte scan of the
+        memory-mapped file, since ElementTree does not report offsets.
+        """
+        with self.stats.phase('mark_index'):
+            with open(self.xml_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                spans = _scan_marks(data)
+            if [name for name, _, _ in spans] != [brand['name'] for brand in self.brands]:
+                raise ValueError("The <mark> byte scan does not match the parsed brands")
+
+            # (keys, ids) per brand: generation id, external id and facet dimensions
+            models, specifications, facets = ({brand['id']: ([], []) for brand in self.brands}
+                                              for _ in range(3))
+            for model in self.models:
+                keys, ids = models[model['brand_id']]
+                keys.append(model['generation_id'])
+                ids.append(model['id'])
+            columns = self.modifications.columns
+            for brand_id, external_id, id_ in zip(columns['brand_id'], self.modifications.external_ids,
+                                                  columns['id']):
+                keys, ids = specifications[brand_id]
+                keys.append(external_id)
+                ids.append(id_)
+            for row in self._aggregates()[1]:
+                keys, ids = facets[row[1]]
+                keys.append(_facet_key(row))
+                ids.append(row[0])
+
+            _write_json(index_file, {
+                'version': MARK_INDEX_VERSION,
+                'source': _source_stamp(self.xml_file),
+                'brand_rules': self.brand_rules.digest,
+                'registries': {registry.table: list(registry)
+                               for registry in (self.countries,) + self._row_dimensions()},
+                'next_ids': {
+                    'Model': len(self.models) + 1,
+                    'Specification': len(self.modifications) + 1,
+                    'SpecificationFacet': len(self._aggregates()[1]) + 1,
+                },
+                'marks': [
+                    {'name': name, 'span': [start, end], 'brand_id': brand['id'],
+                     'models': _keyed_ids(*models[brand['id']]),
+                     'specifications': _keyed_ids(*specifications[brand['id']]),
+                     'facets': _keyed_ids(*facets[brand['id']])}
+                    for (name, start, end), brand in zip(spans, self.brands)
+                ],
+            })
+
+        print(f"🗺️  Mark index saved: {index_file}")
+
+    def generate_brand_patch(self, output_file: str, index_file: str, brand_names: List[str]):
+        """Re-parse only the named brands and write SQL that replaces their rows
+
+        index_file is the mark index written by the full run whose data is
+        loaded (see write_mark_index). Each brand is parsed from its byte
+        range of the memory-mapped XML, rescanned if the file changed. Rows
+        keep the id their natural key (generation id, external id) had
+        before, rows with a new key get ids past the largest ones handed out
+        so far, and ids whose key is gone are deleted. Lookup values must already be known, because their
+        ids follow the sorted values of the whole catalog. The index is
+        updated for the next patch, so every patch has to be applied.
+        """
+        with open(index_file, encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') != MARK_INDEX_VERSION:
+            raise ValueError(f"Unsupported mark index version: {index.get('version')}")
+        if index['brand_rules'] != self.brand_rules.digest:
+            raise ValueError("Brand rules changed since the mark index was written; run a full parse")
+
+        marks = index['marks']
+        next_ids = index['next_ids']
+        registries = {registry.table: registry for registry in (self.countries,) + self._row_dimensions()}
+        for table, values in index['registries'].items():
+            for value in values:
+                registries[table].add(value)
+
+        print(f"🔄 Parsing brands: {', '.join(brand_names)}")
+        parsed = []
+        with open(self.xml_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if index['source'] == _source_stamp(self.xml_file):
+                spans = [(entry['name'], *entry['span']) for entry in marks]
+            else:
+                with self.stats.phase('mark_scan'):
+                    spans = _scan_marks(data)
+                if [name for name, _, _ in spans] == [entry['name'] for entry in marks]:
+                    for entry, (_, start, end) in zip(marks, spans):
+                        entry['span'] = [start, end]
+                    index['source'] = _source_stamp(self.xml_file)
+
+            for name in brand_names:
+                entries = [entry for entry in marks if entry['name'] == name]
+                found = [(start, end) for found_name, start, end in spans if found_name == name]
+                if len(entries) != 1 or len(found) != 1:
+                    raise ValueError(f"Brand {name!r} occurs {len(entries)} times in the mark index and "
+                                     f"{len(found)} times in the XML instead of once; run a full parse")
+
+                start, end = found[0]
+                with self.stats.phase('xml_load'):
+                    mark = ET.fromstring(data[start:end])
+                first_model, first_row = len(self.models), len(self.modifications)
+                self._parse_mark(mark, entries[0]['brand_id'], first_model + 1, first_row + 1)
+                parsed.append((entries[0], first_model, len(self.models), first_row, len(self.modifications)))
+
+        added = {table: [value for value in registry if value not in index['registries'][table]]
+                 for table, registry in registries.items()}
+        added = {table: values for table, values in added.items() if values}
+        if added:
+            raise ValueError(f"New lookup values {added} would renumber existing ids; run a full parse")
+
+        removed = {'Model': [], 'Specification': []}
+
+        def reassign(entry: Dict, key: str, table: str, keys) -> List[int]:
+            """Ids of the brand's rows: the previous id of each known key, a fresh one for a new key"""
+            previous = entry[key]
+            keys = _unique_keys(keys)
+            ids = []
+            for natural_key in keys:
+                if natural_key not in previous:
+                    previous[natural_key] = next_ids[table]
+                    next_ids[table] += 1
+                ids.append(previous[natural_key])
+            current = set(keys)
+            removed.setdefault(table, []).extend(id_ for natural_key, id_ in previous.items()
+                                                 if natural_key not in current)
+            entry[key] = dict(zip(keys, ids))
+            return ids
+
+        store = self.modifications
+        ids, model_ids = store.columns['id'], store.columns['model_id']
+        for entry, first_model, last_model, first_row, last_row in parsed:
+            stable = {}
+            models = self.models[first_model:last_model]
+            for model, id_ in zip(models, reassign(entry, 'models', 'Model',
+                                                   [model['generation_id'] for model in models])):
+                stable[model['id']] = id_
+                model['id'] = id_
+            for row, id_ in enumerate(reassign(entry, 'specifications', 'Specification',
+                                               store.external_ids[first_row:last_row]), first_row):
+                ids[row] = id_
+                model_ids[row] = stable[model_ids[row]]
+
+        with self.stats.phase('spec_generation'):
+            self._generate_specs()
+        model_stats, facets = self._aggregates()
+        facet_rows = []
+        for entry, *_ in parsed:
+            rows = [row for row in facets if row[1] == entry['brand_id']]
+            facet_rows.extend((id_, *row[1:]) for id_, row in
+                              zip(reassign(entry, 'facets', 'SpecificationFacet', map(_facet_key, rows)), rows))
+
+        print(f"📝 Generating brand patch: {output_file}")
+        brand_ids = ', '.join(str(entry['brand_id']) for entry, *_ in parsed)
+        with self._open_output(output_file) as f:
+            f.write("-- Cars Database Brand Patch\n")
             f.write(f"-- Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"-- Brands: {len(self.brands)}\n")
-            f.write(f"-- Models: {len(self.models)}\n")
-            f.write(f"-- Modifications: {len(self.modifications)}\n")
+            f.write(f"-- Brands: {', '.join(brand_names)}\n")
             f.write("\n")
 
             f.write("SET client_encoding = 'UTF8';\n")
@@ -325,159 +2218,264 @@ class CarsXMLParser:
 
             f.write("BEGIN;\n\n")
 
-            # Countries
-            f.write("-- Countries\n")
-            countries = self._get_unique_countries()
-            f.write('INSERT INTO "Country" (id, name, code, "createdAt", "updatedAt") VALUES\n')
-            country_values = []
-            for i, country in enumerate(countries, 1):
-                code = self._country_code(country)
-                country_values.append(
-                    f"({i}, '{country}', '{code}', NOW(), NOW())"
-                )
-            f.write(",\n".join(country_values) + ";\n\n")
-
-            # Cities (sample data)
-            f.write("-- Cities\n")
-            cities = self._get_sample_cities()
-            f.write('INSERT INTO "City" (id, name, "countryId", "createdAt", "updatedAt") VALUES\n')
-            city_values = []
-            for i, (city, country) in enumerate(cities, 1):
-                country_id = countries.index(country) + 1
-                city_values.append(
-                    f"({i}, '{city}', {country_id}, NOW(), NOW())"
-                )
-            f.write(",\n".join(city_values) + ";\n\n")
-
-            # Body types
-            f.write("-- Body Types\n")
-            body_types_list = sorted(list(self.body_types))
-            f.write('INSERT INTO "BodyType" (id, name, "createdAt", "updatedAt") VALUES\n')
-            body_type_values = []
-            for i, body_type in enumerate(body_types_list, 1):
-                body_type_values.append(
-                    f"({i}, '{body_type}', NOW(), NOW())"
-                )
-            f.write(",\n".join(body_type_values) + ";\n\n")
-
-            # Fuel types
-            f.write("-- Fuel Types\n")
-            fuel_types_list = sorted(list(self.fuel_types))
-            f.write('INSERT INTO "FuelType" (id, name, "createdAt", "updatedAt") VALUES\n')
-            fuel_type_values = []
-            for i, fuel_type in enumerate(fuel_types_list, 1):
-                fuel_type_values.append(
-                    f"({i}, '{fuel_type}', NOW(), NOW())"
-                )
-            f.write(",\n".join(fuel_type_values) + ";\n\n")
-
-            # Transmissions
-            f.write("-- Transmissions\n")
-            transmissions_list = sorted(list(self.transmissions))
-            f.write('INSERT INTO "Transmission" (id, name, "createdAt", "updatedAt") VALUES\n')
-            transmission_values = []
-            for i, transmission in enumerate(transmissions_list, 1):
-                transmission_values.append(
-                    f"({i}, '{transmission}', NOW(), NOW())"
-                )
-            f.write(",\n".join(transmission_values) + ";\n\n")
-
-            # Drive types
-            f.write("-- Drive Types\n")
-            drive_types_list = sorted(list(self.drive_types))
-            f.write('INSERT INTO "DriveType" (id, name, "createdAt", "updatedAt") VALUES\n')
-            drive_type_values = []
-            for i, drive_type in enumerate(drive_types_list, 1):
-                drive_type_values.append(
-                    f"({i}, '{drive_type}', NOW(), NOW())"
-                )
-            f.write(",\n".join(drive_type_values) + ";\n\n")
-
-            # Brands
-            f.write("-- Brands\n")
-            f.write('INSERT INTO "Brand" (id, name, code, country, logo, "isPopular", "createdAt", "updatedAt") VALUES\n')
-            brand_values = []
-            for brand in self.brands:
-                is_popular = 'true' if self._is_popular_brand(brand['name']) else 'false'
-                logo = f"https://cdn.example.com/brands/{brand['code'].lower()}.png"
-                brand_values.append(
-                    f"({brand['id']}, '{self._escape(brand['name'])}', '{brand['code']}', '{brand['country']}', '{logo}', {is_popular}, NOW(), NOW())"
-                )
-            f.write(",\n".join(brand_values) + ";\n\n")
-
-            # Models (in batches to avoid huge INSERT)
-            f.write("-- Models\n")
-            batch_size = 1000
-            for i in range(0, len(self.models), batch_size):
-                batch = self.models[i:i+batch_size]
-                f.write('INSERT INTO "Model" (id, name, code, "brandId", "generationId", image, "createdAt", "updatedAt") VALUES\n')
-                model_values = []
-                for model in batch:
-                    image = f"https://cdn.example.com/models/{model['code'].lower()}.png"
-                    model_values.append(
-                        f"({model['id']}, '{self._escape(model['name'])}', '{self._escape(str(model['code']))}', {model['brand_id']}, '{model['generation_id']}', '{image}', NOW(), NOW())"
-                    )
-                f.write(",\n".join(model_values) + ";\n\n")
-
-            # Specifications (in batches)
-            f.write("-- Specifications\n")
-            for i in range(0, len(self.modifications), batch_size):
-                batch = self.modifications[i:i+batch_size]
-                f.write('INSERT INTO "Specification" (id, "modelId", "brandId", name, "externalId", "bodyTypeId", "engineVolume", horsepower, "fuelTypeId", "transmissionId", "driveTypeId", "yearFrom", "yearTo", "priceMin", "priceMax", "fuelConsumption", "acceleration0to100", "maxSpeed", "maintenanceCostPerYear", "createdAt", "updatedAt") VALUES\n')
-                spec_values = []
-                for mod in batch:
-                    body_type_id = body_types_list.index(mod['body_type']) + 1
-                    fuel_type_id = fuel_types_list.index(mod['fuel_type']) + 1
-                    transmission_id = transmissions_list.index(mod['transmission']) + 1
-                    drive_type_id = drive_types_list.index(mod['drive_type']) + 1 if mod['drive_type'] else 'NULL'
-
-                    spec_values.append(
-                        f"({mod['id']}, {mod['model_id']}, {mod['brand_id']}, '{self._escape(mod['name'])}', '{mod['external_id']}', {body_type_id}, {mod['engine_volume']}, {mod['horsepower']}, {fuel_type_id}, {transmission_id}, {drive_type_id}, {mod['year_from']}, {mod['year_to']}, {mod['price_min']}, {mod['price_max']}, {mod['fuel_consumption']}, {mod['acceleration_0_100']}, {mod['max_speed']}, {mod['maintenance_cost_per_year']}, NOW(), NOW())"
-                    )
-                f.write(",\n".join(spec_values) + ";\n\n")
-
-            # Update sequences
+            f.write("-- Aggregates of the patched brands (rebuilt below)\n")
+            for table in AGGREGATE_TABLES:
+                f.write(f'DELETE FROM "{table}" WHERE "brandId" IN ({brand_ids});\n')
+            f.write("\n")
+
+            writer = InsertDumpWriter(f)
+            for comment, table, rows, batched in (
+                ('Brands', 'Brand', [self._brand_row(brand) for brand in self.brands], False),
+                ('Models', 'Model', [self._model_row(model) for model in self.models], True),
+                ('Specifications', 'Specification', self._specification_rows(), True),
+            ):
+                if rows:
+                    f.write(f"-- {comment}\n")
+                    writer.write_table(table, rows, batched, upsert=True)
+
+            # Rows no longer in the XML go once nothing references them
+            self._write_deletes(f, 'Specification', removed['Specification'])
+            self._write_deletes(f, 'Model', removed['Model'])
+
+            for comment, table, rows in (('Model Stats', 'ModelStats', model_stats),
+                                         ('Specification Facets', 'SpecificationFacet', facet_rows)):
+                if rows:
+                    f.write(f"-- {comment}\n")
+                    writer.write_table(table, rows, batched=True)
+
             f.write("-- Update sequences\n")
-            f.write(f"SELECT setval('\"Country_id_seq\"', {len(countries)}, true);\n")
-            f.write(f"SELECT setval('\"City_id_seq\"', {len(cities)}, true);\n")
-            f.write(f"SELECT setval('\"BodyType_id_seq\"', {len(body_types_list)}, true);\n")
-            f.write(f"SELECT setval('\"FuelType_id_seq\"', {len(fuel_types_list)}, true);\n")
-            f.write(f"SELECT setval('\"Transmission_id_seq\"', {len(transmissions_list)}, true);\n")
-            f.write(f"SELECT setval('\"DriveType_id_seq\"', {len(drive_types_list)}, true);\n")
-            f.write(f"SELECT setval('\"Brand_id_seq\"', {len(self.brands)}, true);\n")
-            f.write(f"SELECT setval('\"Model_id_seq\"', {len(self.models)}, true);\n")
-            f.write(f"SELECT setval('\"Specification_id_seq\"', {len(self.modifications)}, true);\n")
+            for table, next_id in next_ids.items():
+                f.write(f"SELECT setval('\"{table}_id_seq\"', {next_id - 1}, true);\n")
             f.write("\n")
 
             f.write("COMMIT;\n")
 
-        print(f"✅ SQL dump generated successfully!")
+        _write_json(index_file, index)
+        print(f"✅ Brand patch generated successfully!")
+
+    def build_manifest(self) -> Dict:
+        """Map the natural key of every Brand, Model and Specification row to [id, fingerprint]
+
+        The aggregate tables are keyed by their AGGREGATE_KEYS columns; their
+        fingerprint leaves out the first column, so a facet whose id changed
+        but whose contents did not still matches.
+        """
+        tables = {}
+        for _, table, rows, _ in self._dump_tables():
+            if table in AGGREGATE_TABLES:
+                key_columns = AGGREGATE_KEYS[table]
+                tables[table] = {_aggregate_key(row, key_columns): [row[0], _fingerprint(row[1:])]
+                                 for row in rows}
+                continue
+            if table not in MANIFEST_KEYS:
+                continue
+
+            key_index = MANIFEST_KEYS[table]
+            keys = _unique_keys(row[key_index] for row in rows)
+            tables[table] = {key: [row[0], _fingerprint(row)] for key, row in zip(keys, rows)}
+
+        return {'version': MANIFEST_VERSION, 'tables': tables}
+
+    def write_manifest(self, manifest_file: str, manifest: Dict = None):
+        """Save the manifest for the next incremental run"""
+        if manifest is None:
+            manifest = self.build_manifest()
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        print(f"🧾 Manifest saved: {manifest_file}")
+
+    def _snapshot_key(self) -> Dict:
+        """Everything a snapshot's content depends on besides the parser code"""
+        if self._input_digest is None:
+            self._input_digest = file_digest(self.xml_file)
+        return {
+            'input': self._input_digest,
+            'version': SNAPSHOT_VERSION,
+            # Brand countries and tiers are resolved while parsing
+            'brand_rules': self.brand_rules.digest,
+            # "по н.в." year ranges end in the current year
+            'year': datetime.now().year,
+            'byteorder': sys.byteorder,
+        }
+
+    def save_snapshot(self, snapshot_file: str):
+        """Save the parsed data (before spec generation) to a binary snapshot.
+
+        The JSON header holds the key, brands, models, registries and the
+        modification strings; the numeric modification columns follow as
+        raw arrays (see _write_sections).
+        """
+        with self.stats.phase('snapshot_save'):
+            store = self.modifications
+            _write_sections(snapshot_file, SNAPSHOT_MAGIC, {
+                'key': self._snapshot_key(),
+                'brands': [[b['id'], b['name'], b['code'], b['country']] for b in self.brands],
+                'models': [[m['id'], m['brand_id'], m['name'], m['code'], m['generation_id']]
+                           for m in self.models],
+                'registries': {registry.table: list(registry)
+                               for registry in (self.countries,) + self._row_dimensions()},
+                'categories': store.categories,
+                'names': store.names,
+                'external_ids': store.external_ids,
+            }, {name: store.columns[name] for name in SNAPSHOT_COLUMNS})
+
+        print(f"💾 Snapshot saved: {snapshot_file}")
+
+    def load_snapshot(self, snapshot_file: str) -> bool:
+        """Restore parsed data from a snapshot; False if it is missing or stale.
+
+        The numeric columns are memory-mapped views of the file rather than
+        copies, so the store is read-only afterwards apart from the spec
+        columns that _generate_specs fills.
+        """
+        if not os.path.exists(snapshot_file):
+            return False
+
+        with self.stats.phase('snapshot_load'):
+            mapped = _map_sections(snapshot_file, SNAPSHOT_MAGIC)
+            if mapped is None or mapped[0]['key'] != self._snapshot_key():
+                return False
+
+            header, sections = mapped
+            store = self.modifications
+            store.columns.update(sections)
+            store.names = header['names']
+            store.external_ids = header['external_ids']
+            store.categories = header['categories']
+            store._codes = {name: {value: code for code, value in enumerate(values)}
+                            for name, values in store.categories.items()}
+
+            self.brands = [dict(zip(('id', 'name', 'code', 'country'), row)) for row in header['brands']]
+            self.models = [dict(zip(('id', 'brand_id', 'name', 'code', 'generation_id'), row))
+                           for row in header['models']]
+            registries = {registry.table: registry for registry in (self.countries,) + self._row_dimensions()}
+            for table, values in header['registries'].items():
+                for value in values:
+                    registries[table].add(value)
+
+        self.run_info['snapshot'] = snapshot_file
+        print(f"⚡ Loaded snapshot: {snapshot_file}")
+        return True
+
+    def generate_sql_delta(self, output_file: str, previous: Dict) -> Dict:
+        """Generate upserts and deletes that turn the previous run into this one
+
+        previous is the manifest written by the earlier run. Brand, Model and
+        Specification rows are only written when their id or fingerprint
+        changed; reference tables are small and always upserted. ModelStats
+        and SpecificationFacet rows are upserted per changed group, and a
+        facet keeps the id it had in the previous run (see
+        _keep_facet_ids). Returns the manifest of this run.
+        """
+        if previous.get('version') != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported manifest version: {previous.get('version')}")
+
+        print(f"📝 Generating SQL delta: {output_file}")
+        self._keep_facet_ids(previous['tables']['SpecificationFacet'])
+        manifest = self.build_manifest()
+
+        tables = list(MANIFEST_KEYS) + list(AGGREGATE_TABLES)
+        changed = {}
+        deleted = {}
+        for table in tables:
+            current = manifest['tables'][table]
+            before = previous['tables'].get(table, {})
+            changed[table] = {id_ for key, (id_, fp) in current.items() if before.get(key) != [id_, fp]}
+            deleted[table] = sorted({id_ for id_, _ in before.values()} - {id_ for id_, _ in current.values()})
+
+        with self._open_output(output_file) as f:
+            # Header
+            f.write("-- Cars Database Delta\n")
+            f.write(f"-- Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            for table in tables:
+                f.write(f"-- {table}: {len(changed[table])} upserted, {len(deleted[table])} deleted\n")
+            f.write("\n")
+
+            f.write("SET client_encoding = 'UTF8';\n")
+            f.write("SET standard_conforming_strings = on;\n")
+            f.write("\n")
+
+            f.write("BEGIN;\n\n")
+
+            # Specifications go first so no removed row still references a model
+            self._write_deletes(f, 'Specification', deleted['Specification'])
+            for table in AGGREGATE_TABLES:
+                self._write_deletes(f, table, deleted[table])
+
+            writer = InsertDumpWriter(f)
+            for comment, table, rows, batched in self._dump_tables():
+                if table in changed:
+                    rows = [row for row in rows if row[0] in changed[table]]
+                if rows:
+                    f.write(f"-- {comment}\n")
+                    if table == 'Country':
+                        self._write_country_code_moves(f, rows)
+                    writer.write_table(table, rows, batched, upsert=True)
+
+            self._write_deletes(f, 'Model', deleted['Model'])
+            self._write_deletes(f, 'Brand', deleted['Brand'])
+
+            # Reference ids are dense, so anything past the last one is gone
+            f.write("-- Trim reference tables\n")
+            for registry in (self.cities, self.countries, self.body_types,
+                             self.fuel_types, self.transmissions, self.drive_types):
+                f.write(f'DELETE FROM "{registry.table}" WHERE id > {len(registry)};\n')
+            f.write("\n")
+
+            f.write(self._sequences_sql())
 
-    def _escape(self, text: str) -> str:
-        """Escape single quotes for SQL"""
-        return text.replace("'", "''")
+            f.write("COMMIT;\n")
 
-    def _get_unique_countries(self) -> List[str]:
-        """Get unique list of countries"""
-        countries = set(brand['country'] for brand in self.brands)
-        return sorted(list(countries))
+        print(f"✅ SQL delta generated successfully!")
+        return manifest
+
+    def _keep_facet_ids(self, previous: Dict[str, List]):
+        """Give every facet the id its natural key had in the previous manifest
+
+        Facet ids are otherwise positions in the sorted keys, so one new body
+        type or brand would renumber every facet after it. New keys get ids
+        past the largest previous one, so they never reuse the id of a facet
+        the delta deletes.
+        """
+        model_stats, facets = self._aggregates()
+        key_columns = AGGREGATE_KEYS['SpecificationFacet']
+        next_id = max((id_ for id_, _ in previous.values()), default=0) + 1
+        rows = []
+        for row in facets:
+            entry = previous.get(_aggregate_key(row, key_columns))
+            if entry is None:
+                entry = [next_id]
+                next_id += 1
+            rows.append((entry[0], *row[1:]))
+        self._aggregate_rows = (model_stats, rows)
+
+    def _write_country_code_moves(self, f, rows: List[tuple]):
+        """Lower-case the codes of Country rows that change id or go away
+
+        Country ids follow the sorted names, so a removed country shifts the
+        ids of every country after it, and an upsert by id would hand a row
+        a code that another row still holds. Codes are upper-case letters,
+        so lower-cased ones cannot clash with any code the upsert writes;
+        rows past the last id are trimmed at the end of the delta.
+        """
+        pairs = ', '.join(f"({id_}, {_sql_text(code)})" for id_, _, code in rows)
+        f.write(f'UPDATE "Country" SET code = lower(code) WHERE (id, code) NOT IN (VALUES {pairs});\n')
+
+    def _write_deletes(self, f, table: str, ids: List[int]):
+        """Write batched DELETE statements for the given primary keys"""
+        if not ids:
+            return
+
+        f.write(f"-- Delete removed {table} rows\n")
+        batch_size = InsertDumpWriter.batch_size
+        for i in range(0, len(ids), batch_size):
+            id_list = ', '.join(str(id_) for id_ in ids[i:i+batch_size])
+            f.write(f'DELETE FROM "{table}" WHERE {TABLE_COLUMNS[table][0][0]} IN ({id_list});\n')
+        f.write("\n")
 
     def _country_code(self, country: str) -> str:
         """Get country code"""
-        codes = {
-            'Россия': 'RU',
-            'Германия': 'DE',
-            'Япония': 'JP',
-            'США': 'US',
-            'Южная Корея': 'KR',
-            'Китай': 'CN',
-            'Франция': 'FR',
-            'Италия': 'IT',
-            'Великобритания': 'GB',
-            'Швеция': 'SE',
-            'Другое': 'XX'
-        }
-        return codes.get(country, 'XX')
+        return self.brand_rules.country_code(country)
 
     def _get_sample_cities(self) -> List[Tuple[str, str]]:
         """Get sample cities for each country"""
@@ -504,32 +2502,225 @@ class CarsXMLParser:
 
     def _is_popular_brand(self, brand_name: str) -> bool:
         """Check if brand is popular"""
-        popular = ['Toyota', 'Honda', 'Mercedes-Benz', 'BMW', 'Audi', 'Volkswagen',
-                  'Ford', 'Hyundai', 'Kia', 'Mazda', 'Nissan', 'Lexus',
-                  'Lada', 'Renault', 'Peugeot', 'Citroën']
-        return brand_name in popular
+        return self.brand_rules.classify(brand_name)[2]
 
 
-def main():
-    import sys
+# Brand rules of the parent process, set in every --jobs worker
+_worker_brand_rules = None
+
 
-    xml_file = '/c/projects/cars/cars.xml'
-    output_file = '/c/projects/cars/database/dumps/initial-data.sql'
+def _init_worker(brand_rules: BrandRules):
+    global _worker_brand_rules
+    _worker_brand_rules = brand_rules
+
+
+_MARK_START = re.compile(rb'<mark[\s/>]')
+
+
+def _scan_marks(data) -> List[Tuple[str, int, int]]:
+    """(name, start, end) byte range of every <mark> element, found without parsing the XML.
+
+    Relies on <mark> elements never nesting, as in the catalog. Only the
+    start tags are parsed, to decode the names.
+    """
+    spans = []
+    position = 0
+    while True:
+        match = _MARK_START.search(data, position)
+        if match is None:
+            return spans
+
+        start = match.start()
+        tag_end = data.find(b'>', start) + 1
+        if data[tag_end - 2:tag_end] == b'/>':
+            end = tag_end
+            tag = data[start:tag_end]
+        else:
+            end = data.find(b'</mark>', tag_end)
+            if end < 0:
+                raise ValueError(f"Unclosed <mark> at byte {start}")
+            end += len(b'</mark>')
+            tag = data[start:tag_end - 1] + b'/>'
+        spans.append((ET.fromstring(tag).get('name'), start, end))
+        position = end
+
+
+def _span_chunks(spans: List[Tuple[str, int, int]], size: int) -> List[List[Tuple[int, int]]]:
+    """Group consecutive (start, end) byte ranges into chunks of about size bytes"""
+    chunks = []
+    chunk = []
+    chunk_bytes = 0
+    for _, start, end in spans:
+        chunk.append((start, end))
+        chunk_bytes += end - start
+        if chunk_bytes >= size:
+            chunks.append(chunk)
+            chunk = []
+            chunk_bytes = 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _parse_feed(task: Tuple[str, bool]):
+    """Pool worker: parse one whole feed serially with ids starting at 1"""
+    xml_file, stream = task
+    parser = CarsXMLParser(xml_file, _worker_brand_rules)
+    memo_before = _memo_counters()
+    parser._parse_xml(stream, 1)
+
+    dimensions = [list(registry) for registry in parser._row_dimensions()]
+    return (parser.brands, parser.models, parser.modifications, dimensions,
+            _memo_delta(memo_before), parser.stats)
+
+
+def _parse_mark_spans(task: Tuple[str, List[Tuple[int, int]]]):
+    """Pool worker: parse the <mark> elements at the given byte ranges with ids starting at 1"""
+    xml_file, spans = task
+    parser = CarsXMLParser(xml_file, _worker_brand_rules)
+    memo_before = _memo_counters()
+    model_id_counter = 1
+    modification_id_counter = 1
+
+    with open(xml_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for brand_id_counter, (start, end) in enumerate(spans, 1):
+            with parser.stats.phase('xml_load'):
+                mark = ET.fromstring(data[start:end])
+            model_id_counter, modification_id_counter = parser._parse_mark(
+                mark, brand_id_counter, model_id_counter, modification_id_counter
+            )
+
+    dimensions = [list(registry) for registry in parser._row_dimensions()]
+    return (parser.brands, parser.models, parser.modifications, dimensions,
+            _memo_delta(memo_before), parser.stats)
+
+
+def main():
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description='Parse cars.xml and generate SQL dump')
+    arg_parser.add_argument('xml_file', nargs='?', default='/c/projects/cars/cars.xml')
+    arg_parser.add_argument('output_file', nargs='?', default='/c/projects/cars/database/dumps/initial-data.sql')
+    arg_parser.add_argument('--feed', metavar='XML', action='append', default=[],
+                            help='another catalog feed to merge into xml_file (repeatable); feeds are parsed '
+                                 'concurrently and on duplicate keys the earlier feed wins')
+    arg_parser.add_argument('--stream', action='store_true',
+                            help='parse with iterparse and free each <mark> after use '
+                                 '(lowers peak memory; the parsed rows are still kept)')
+    arg_parser.add_argument('--format', choices=sorted(DUMP_WRITERS), default='insert',
+                            help='row format of the dump (copy loads several times faster)')
+    arg_parser.add_argument('--jobs', type=int, default=1,
+                            help='number of worker processes for parsing (default: 1)')
+    arg_parser.add_argument('--split', action='store_true',
+                            help='treat output_file as a directory and write one file per table plus a manifest')
+    arg_parser.add_argument('--parts', type=int, default=1,
+                            help='with --split, number of Specification files (default: 1)')
+    arg_parser.add_argument('--compress', choices=sorted(COMPRESSION_SUFFIXES), default='gzip',
+                            help='with --split, compression of the files (default: gzip)')
+    arg_parser.add_argument('--load', metavar='URL',
+                            help='load straight into postgresql://... (or a sqlite:///relative.db or '
+                                 'sqlite:////absolute.db stand-in) instead of writing output_file')
+    arg_parser.add_argument('--brand-rules', metavar='PATH', default=BRAND_RULES_FILE,
+                            help='JSON file with brand countries, price tiers and popular brands')
+    arg_parser.add_argument('--filter-index', metavar='PATH',
+                            help='also write a binary filter index of the Specification rows')
+    arg_parser.add_argument('--mark-index', metavar='PATH',
+                            help='also write the byte range and row ids of every <mark> (read and updated by --brands)')
+    arg_parser.add_argument('--brands', metavar='NAMES',
+                            help='comma-separated brands to re-parse via --mark-index; output_file gets an SQL patch '
+                                 'replacing only their rows')
+    arg_parser.add_argument('--id-map', metavar='PATH',
+                            help='derive Brand/Model/Specification ids from brand code, generation id and external id, '
+                                 'kept stable across runs in this JSON map (created if missing)')
+    arg_parser.add_argument('--snapshot', metavar='PATH',
+                            help='reuse parsed data from this snapshot when cars.xml is unchanged, '
+                                 'otherwise parse and save it there')
+    arg_parser.add_argument('--manifest', metavar='PATH',
+                            help='write a manifest of row fingerprints for incremental runs')
+    arg_parser.add_argument('--delta-from', metavar='PATH',
+                            help='write upserts/deletes against this previous manifest instead of a full dump')
+    arg_parser.add_argument('--report', metavar='PATH',
+                            help='write a JSON report with per-phase timings, counters and cache hit rates')
+    arg_parser.add_argument('--profile', metavar='PATH',
+                            help='run under cProfile and save the stats to PATH')
+    arg_parser.add_argument('--trace-memory', action='store_true',
+                            help='track per-phase peaks and top allocation sites with tracemalloc')
+    args = arg_parser.parse_args()
+
+    if args.delta_from and args.format != 'insert':
+        arg_parser.error('--delta-from only supports --format insert')
+    if args.load and args.delta_from:
+        arg_parser.error('--load cannot be combined with --delta-from')
+    if args.split and (args.load or args.delta_from):
+        arg_parser.error('--split cannot be combined with --load or --delta-from')
+    if args.feed and (args.jobs > 1 or args.snapshot or args.mark_index or args.brands):
+        arg_parser.error('--feed parses each feed in its own process and cannot be combined with --jobs, '
+                         '--snapshot, --mark-index or --brands')
+    if args.id_map and (args.mark_index or args.brands):
+        arg_parser.error('--id-map cannot be combined with --mark-index or --brands, '
+                         'which rely on running-counter ids')
+    if args.brands and not args.mark_index:
+        arg_parser.error('--brands needs the --mark-index of the full run')
+    if args.brands and (args.format != 'insert' or args.load or args.split or args.delta_from
+                        or args.snapshot or args.filter_index or args.manifest):
+        arg_parser.error('--brands only writes an insert patch and cannot be combined with --load, '
+                         '--split, --delta-from, --snapshot, --filter-index or --manifest')
+
+    xml_file = args.xml_file
+    output_file = args.output_file
 
     print("=" * 60)
     print("🚗 Cars XML Parser & SQL Dump Generator")
     print("=" * 60)
     print()
 
-    parser = CarsXMLParser(xml_file)
-    parser.parse()
-    parser.generate_sql_dump(output_file)
+    id_map = IdMap.load(args.id_map) if args.id_map else None
+    parser = CarsXMLParser(xml_file, BrandRules.load(args.brand_rules), id_map)
+
+    if args.trace_memory:
+        tracemalloc.start()
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        _run(parser, args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+
+    allocations = None
+    if args.trace_memory:
+        snapshot = tracemalloc.take_snapshot()
+        allocations = [
+            {'location': str(stat.traceback[0]), 'size_kb': round(stat.size / 1024, 1), 'count': stat.count}
+            for stat in snapshot.statistics('lineno')[:15]
+        ]
+        tracemalloc.stop()
+
+    if args.report:
+        parser.write_report(args.report, allocations)
+
+    if profiler is not None:
+        import pstats
+        print(f"\n🔬 Profile saved: {args.profile} (top functions by cumulative time)")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
 
     print()
     print("=" * 60)
     print("✅ Done!")
     print("=" * 60)
-    print(f"\n📄 SQL dump saved to: {output_file}")
+    if args.load:
+        print(f"\n🗄️  Loaded into: {re.sub(r'//[^/@]*@', '//', args.load)}")
+    elif args.split:
+        print(f"\n📂 Split dump saved to: {output_file}")
+    elif args.brands:
+        print(f"\n🩹 Brand patch saved to: {output_file}")
+    else:
+        print(f"\n📄 SQL dump saved to: {output_file}")
     print(f"📊 Total records:")
     print(f"   - Brands: {len(parser.brands)}")
     print(f"   - Models: {len(parser.models)}")
@@ -538,8 +2729,46 @@ def main():
     print(f"   - Fuel types: {len(parser.fuel_types)}")
     print(f"   - Transmissions: {len(parser.transmissions)}")
     print(f"   - Drive types: {len(parser.drive_types)}")
+    for name, stats in parser.memo_stats.items():
+        print(f"   - Memo {name}: {stats['hits']} hits / {stats['misses']} misses")
+    print(f"⏱️  Phases (wall / cpu):")
+    for name, phase in parser.stats.phases.items():
+        print(f"   - {name}: {phase['wall_s']:.2f}s / {phase['cpu_s']:.2f}s")
     print()
 
 
+def _run(parser: CarsXMLParser, args):
+    """Parse the catalog and write the dump (or delta) requested on the command line"""
+    if args.brands:
+        parser.generate_brand_patch(args.output_file, args.mark_index,
+                                    [name.strip() for name in args.brands.split(',')])
+        return
+
+    manifest = None
+    parser.parse(stream=args.stream, jobs=args.jobs, snapshot=args.snapshot, feeds=args.feed)
+    if args.load:
+        parser.load_into_database(args.load)
+    elif args.split:
+        parser.generate_split_dump(args.output_file, fmt=args.format, parts=args.parts,
+                                   compression=args.compress)
+    elif args.delta_from:
+        with open(args.delta_from, encoding='utf-8') as f:
+            previous = json.load(f)
+        manifest = parser.generate_sql_delta(args.output_file, previous)
+    else:
+        parser.generate_sql_dump(args.output_file, fmt=args.format)
+
+    if args.filter_index:
+        parser.write_filter_index(args.filter_index)
+    if args.mark_index:
+        parser.write_mark_index(args.mark_index)
+    if args.manifest:
+        parser.write_manifest(args.manifest, manifest)
+    if args.id_map:
+        # Only once the output exists, so a failed run assigns nothing
+        parser.id_map.save(args.id_map)
+        print(f"🆔 Id map saved: {args.id_map}")
+
+
 if __name__ == '__main__':
     main()
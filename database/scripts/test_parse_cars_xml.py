@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Regression tests for parse-cars-xml.py on small hand-written catalogs.
+Run from database/scripts with `python3 -m unittest test_parse_cars_xml`
+(`make test-parser`).
+"""
+
+import importlib.util
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import unittest
+from typing import List, Tuple
+from xml.sax.saxutils import quoteattr
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_script(name: str):
+    """Import one of the hyphenated scripts next to this file"""
+    path = os.path.join(SCRIPTS_DIR, f"{name}.py")
+    module_name = name.replace('-', '_')
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+parser_module = load_script('parse-cars-xml')
+
+# (external id, modification name, body type)
+Modification = Tuple[str, str, str]
+# (generation id, model code, modifications)
+Folder = Tuple[str, str, List[Modification]]
+# (brand name, brand code, folders)
+Mark = Tuple[str, str, List[Folder]]
+
+
+def write_catalog(path: str, marks: List[Mark]):
+    """Write a cars.xml-shaped catalog"""
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<catalog>']
+    for name, code, folders in marks:
+        lines.append(f'<mark name={quoteattr(name)}><code>{code}</code>')
+        for generation_id, model, modifications in folders:
+            lines.append(f'<folder name={quoteattr(model.title())} id="{generation_id}"><model>{model}</model>')
+            for external_id, mod_name, body_type in modifications:
+                lines.append(f'<modification name={quoteattr(mod_name)} id="{external_id}">'
+                             f'<body_type>{body_type}</body_type><years>2015 - 2020</years></modification>')
+            lines.append('</folder>')
+        lines.append('</mark>')
+    lines.append('</catalog>')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+
+
+def apply_sql(connection: sqlite3.Connection, path: str):
+    """Run a delta or patch file against SQLite, leaving out the Postgres-only statements"""
+    with open(path, encoding='utf-8') as f:
+        statements = [line for line in f if not line.startswith(('SET ', 'SELECT setval'))]
+    connection.executescript(''.join(statements).replace('NOW()', 'CURRENT_TIMESTAMP'))
+
+
+class CatalogTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.tmp, name)
+
+    def parse(self, marks: List[Mark], name: str = 'cars.xml', **kwargs):
+        xml_file = self.path(name)
+        write_catalog(xml_file, marks)
+        parser = parser_module.CarsXMLParser(xml_file)
+        parser.parse(**kwargs)
+        return parser
+
+    def load(self, parser, name: str) -> sqlite3.Connection:
+        database_file = self.path(name)
+        parser.load_into_database(f"sqlite:///{database_file}")
+        connection = sqlite3.connect(database_file)
+        self.addCleanup(connection.close)
+        return connection
+
+
+def mark(name: str, external_id: int) -> Mark:
+    """A brand with one model and one modification"""
+    code = name.upper()
+    return (name, code, [(f"{external_id}0", f"{code}_MODEL",
+                          [(str(external_id), '1.6 MT (106 л.с.)', 'Седан')])])
+
+
+# One brand for every country the sample cities refer to
+CATALOG = [mark(name, i) for i, name in enumerate(
+    ['Lada', 'BMW', 'Toyota', 'Ford', 'Kia', 'Geely', 'Renault', 'Fiat', 'Jaguar', 'Volvo'], 1)]
+# Not listed in brand-rules.json, so its country is the default one
+ZAZ = mark('ZAZ', 99)
+
+
+class DeltaTest(CatalogTestCase):
+    def delta(self, before: List[Mark], after: List[Mark]) -> Tuple[sqlite3.Connection, sqlite3.Connection]:
+        """Apply the delta between two catalogs to a load of the first; also load the second directly"""
+        parser = self.parse(before, 'before.xml')
+        patched = self.load(parser, 'patched.db')
+        manifest = parser.build_manifest()
+
+        parser = self.parse(after, 'after.xml')
+        parser.generate_sql_delta(self.path('delta.sql'), manifest)
+        apply_sql(patched, self.path('delta.sql'))
+        return patched, self.load(parser, 'expected.db')
+
+    def test_aggregates_upsert_changed_groups_only(self):
+        # A new body type for the first brand sorts its facet between existing ones
+        lada = ('Lada', 'LADA', [('10', 'LADA_MODEL', [('1', '1.6 MT (106 л.с.)', 'Седан'),
+                                                        ('11', '2.0 MT (150 л.с.)', 'Универсал')])])
+        patched, expected = self.delta(CATALOG, [lada] + CATALOG[1:])
+
+        with open(self.path('delta.sql'), encoding='utf-8') as f:
+            delta = f.read()
+        self.assertIn('-- ModelStats: 1 upserted, 0 deleted', delta)
+        self.assertIn('-- SpecificationFacet: 1 upserted, 0 deleted', delta)
+
+        stats = 'SELECT "modelId", "brandId", "specCount", "priceMin", "priceMax" FROM "ModelStats" ORDER BY 1'
+        self.assertEqual(patched.execute(stats).fetchall(), expected.execute(stats).fetchall())
+        facets = ('SELECT "brandId", "bodyTypeId", "fuelTypeId", "transmissionId", "specCount", "priceMin", '
+                  '"priceMax" FROM "SpecificationFacet" ORDER BY 1, 2, 3, 4')
+        self.assertEqual(patched.execute(facets).fetchall(), expected.execute(facets).fetchall())
+        # The facets that were already there keep their ids; the new one comes after them
+        ids = 'SELECT id, "brandId", "bodyTypeId" FROM "SpecificationFacet" ORDER BY id'
+        self.assertEqual(patched.execute(ids).fetchall(),
+                         [(i, i, 1) for i in range(1, len(CATALOG) + 1)] + [(len(CATALOG) + 1, 1, 2)])
+
+    def test_removed_country_shifts_later_codes(self):
+        patched, expected = self.delta(CATALOG + [ZAZ], CATALOG)
+        query = 'SELECT id, name, code FROM "Country" ORDER BY id'
+        self.assertEqual(patched.execute(query).fetchall(), expected.execute(query).fetchall())
+
+
+class FeedsTest(CatalogTestCase):
+    def test_same_name_brands_merge_only_across_feeds(self):
+        # Two Lada marks in the first feed stay apart, as in a single-file run
+        first = [mark('Lada', 1), mark('Lada', 2), mark('BMW', 3)]
+        write_catalog(self.path('second.xml'), [mark('Lada', 4), mark('Toyota', 5)])
+        parser = self.parse(first, 'first.xml', feeds=[self.path('second.xml')])
+
+        self.assertEqual([(brand['id'], brand['name']) for brand in parser.brands],
+                         [(1, 'Lada'), (2, 'Lada'), (3, 'BMW'), (4, 'Toyota')])
+        self.assertEqual([model['brand_id'] for model in parser.models], [1, 2, 3, 1, 4])
+
+
+class IdMapTest(CatalogTestCase):
+    def parse_with_id_map(self):
+        xml_file = self.path('cars.xml')
+        write_catalog(xml_file, CATALOG)
+        parser = parser_module.CarsXMLParser(xml_file, id_map=parser_module.IdMap())
+        parser.parse()
+        return parser
+
+    def test_sequences_start_above_the_hashed_range(self):
+        parser = self.parse_with_id_map()
+        parser.generate_sql_dump(self.path('dump.sql'))
+
+        with open(self.path('dump.sql'), encoding='utf-8') as f:
+            setvals = dict(re.findall(r"setval\('\"(\w+)_id_seq\"', (\d+), true\)", f.read()))
+        for table in ('Brand', 'Model', 'Specification'):
+            self.assertEqual(int(setvals[table]), parser_module.STABLE_ID_SPACE, table)
+
+    def test_split_parts_have_disjoint_id_ranges(self):
+        parser = self.parse_with_id_map()
+        manifest = parser.generate_split_dump(self.path('split'), parts=3, compression='none')
+
+        parts = [entry for entry in manifest['files'] if entry['table'] == 'Specification']
+        self.assertEqual(len(parts), 3)
+        self.assertEqual(sum(entry['rows'] for entry in parts), len(CATALOG))
+        bounds = [bound for entry in parts for bound in entry['id_range']]
+        self.assertEqual(bounds, sorted(bounds))
+
+
+if __name__ == '__main__':
+    unittest.main()